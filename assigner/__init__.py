@@ -20,8 +20,14 @@ from git.cmd import GitCommandNotFound
 
 from assigner.backends.decorators import requires_config_and_backend
 from assigner.exceptions import AssignerException
-from assigner.roster_util import get_filtered_roster
-from assigner import progress
+from assigner.roster_util import (
+    build_student_repo,
+    build_student_repos,
+    get_filtered_roster,
+    resolve_user_ids,
+)
+from assigner import cache, parallel, progress
+from assigner.plan import Plan, pages
 
 from pkg_resources import get_distribution, DistributionNotFound
 
@@ -60,40 +66,73 @@ subcommands = [
 
 
 @requires_config_and_backend
-def manage_repos(conf, backend, args, action):
+def manage_repos(conf, backend, args, action, requests=1):
     """Performs an action (lambda) on all student repos
+
+    requests is how many API requests the action makes on each repo, for
+    the --dry-run estimate.
     """
     hw_name = args.name
     dry_run = args.dry_run
 
-    namespace = conf.namespace
-    semester = conf.semester
     backend_conf = conf.backend
 
     roster = get_filtered_roster(conf.roster, args.section, args.student)
 
-    count = 0
-    for student in progress.iterate(roster):
-        username = student["username"]
-        student_section = student["section"]
+    if dry_run:
+        repos = [build_student_repo(conf, backend, hw_name, s) for s in roster]
+        print_plan(backend_conf.get("host", ""), roster, repos, args.jobs, requests)
+        return
+
+    resolve_user_ids(conf, backend, roster)
+
+    students = []
+    for student in roster:
         if "id" not in student:
             logging.warning(
-                "Student %s does not have a gitlab account.", username
+                "Student %s does not have a gitlab account.", student["username"]
             )
             continue
+        students.append(student)
 
-        full_name = backend.student_repo.build_name(semester, student_section,
-                                                    hw_name, username)
+    repos = build_student_repos(conf, backend, hw_name, students)
 
-        repo = backend.student_repo(backend_conf, namespace, full_name)
-        if not dry_run:
-            if action(repo, student):
-                count += 1
-        else:
+    def run_action(student_repo):
+        student, repo = student_repo
+        return action(repo, student)
+
+    count = 0
+    failures = []
+    results = parallel.imap(run_action, list(zip(students, repos)), args.jobs)
+    for (student, _), changed, error in progress.iterate(results, len(students)):
+        if error is not None:
+            failures.append((student, error))
+        elif changed:
             count += 1
 
     print("Changed {} repositories.".format(count))
 
+    if failures:
+        logging.error("Failed to change %d repositories:", len(failures))
+        for student, error in failures:
+            logging.error("  %s: %s", student["username"], error)
+            logging.debug("Traceback for %s:", student["username"], exc_info=error)
+
+
+def print_plan(host, roster, repos, jobs, requests=1):
+    """Reports what manage_repos would do without making any requests"""
+    plan = Plan(host)
+    if not all(repo.is_cached() for repo in repos):
+        plan.add_requests(pages(len(repos)))  # Looking up the repos
+
+    for student, repo in zip(roster, repos):
+        if "id" not in student:
+            plan.add_requests(1)  # Looking up their user id
+        plan.add("change" if repo.is_cached() else "change (not cached)", requests)
+
+    print("Planned changes:")
+    plan.report(jobs)
+
 
 def configure_logging():
     root_logger = logging.getLogger()
@@ -143,6 +182,8 @@ def make_parser():
                         help="Path a config file")
     parser.add_argument("--tracebacks", action="store_true",
                         help="Show full tracebacks")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Don't use cached project, namespace, or user lookups")
     parser.add_argument("--verbosity", default="INFO",
                         choices=["DEBUG", "INFO", "WARNING", "ERROR"],
                         help="Desired log level")
@@ -188,6 +229,9 @@ def main(args=sys.argv[1:]):
 
     logging.debug("This is Assigner version %s", __version__)
 
+    if args.no_cache:
+        cache.disable()
+
     # Do it
     try:
         args.run(args)
@@ -204,6 +248,8 @@ def main(args=sys.argv[1:]):
             logger.error(str(e))
             logger.error("This is a bug. Please file an issue here: https://github.com/redkyn/assigner/issues/new")
         raise SystemExit(1) from e
+    finally:
+        cache.save_latencies()
 
 
 if __name__ == "__main__":
@@ -1,6 +1,6 @@
 import git
 import re
-from typing import Optional, Type, TypeVar, List, Any, Dict
+from typing import Optional, Type, TypeVar, List, Any, Dict, Iterator, Tuple
 from assigner.exceptions import AssignerException
 
 
@@ -62,6 +62,26 @@ class RepoBase:
     def already_exists(self) -> bool:
         raise NotImplementedError
 
+    def is_cached(self) -> bool:
+        """Whether this repo's metadata can be used without a request"""
+        raise NotImplementedError
+
+    def is_empty(self) -> bool:
+        """Whether the repo exists but has nothing pushed to it"""
+        raise NotImplementedError
+
+    @classmethod
+    def prefetch_info(
+        cls,
+        config,
+        namespace: str,
+        repos: List["RepoBase"],
+        search: str = "",
+        refresh: bool = False,
+    ) -> None:
+        """Looks up info for many repos in namespace at once"""
+        raise NotImplementedError
+
     def get_head(self, branch: str) -> git.refs.head.Head:
         raise NotImplementedError
 
@@ -71,17 +91,29 @@ class RepoBase:
     def pull(self, branch: str) -> None:
         raise NotImplementedError
 
+    def merge_fetched(self, branch: str) -> None:
+        """Merge the already-fetched remote branch into the checked out branch"""
+        raise NotImplementedError
+
     def clone_to(
         self, dir_name: str, branch: Optional[str], attempts: Optional[int]
     ) -> None:
         raise NotImplementedError
 
+    def mirror_to(self, dir_name: str, branch: Optional[List[str]]) -> git.Repo:
+        """Clones a bare mirror to dir_name, or updates the one already there"""
+        raise NotImplementedError
+
     def add_local_copy(self, dir_name: str) -> None:
         raise NotImplementedError
 
     def delete(self) -> None:
         raise NotImplementedError
 
+    def wait_for_deletion(self) -> None:
+        """Blocks until a deleted repo's name can be used again"""
+        raise NotImplementedError
+
     @classmethod
     def create_group(cls, group, config) -> None:
         raise NotImplementedError
@@ -90,7 +122,11 @@ class RepoBase:
     def get_user_id(cls, username: str, config) -> str:
         raise NotImplementedError
 
-    def list_members(self) -> str:
+    @classmethod
+    def get_user_ids(cls, usernames: List[str], config) -> Dict[str, str]:
+        raise NotImplementedError
+
+    def list_members(self) -> Iterator[Dict[str, Any]]:
         raise NotImplementedError
 
     def list_authorized_emails(self) -> List[str]:
@@ -111,7 +147,13 @@ class RepoBase:
     def delete_member(self, user_id: str) -> str:
         raise NotImplementedError
 
-    def list_commits(self, ref_name: str = "master", since: str = "") -> str:
+    def list_commits(
+        self,
+        ref_name: str = "master",
+        since: str = "",
+        until: str = "",
+        per_page: Optional[int] = None,
+    ) -> Iterator[Dict[str, Any]]:
         raise NotImplementedError
 
     def list_commit_hashes(
@@ -122,22 +164,36 @@ class RepoBase:
     def list_commit_files(self, commit_hash) -> List[str]:
         raise NotImplementedError
 
+    def compare(self, from_ref: str, to_ref: str) -> Tuple[List[str], List[str]]:
+        """Lists the commits on to_ref since from_ref and the files they changed"""
+        raise NotImplementedError
+
+    def is_ancestor(self, commit_hash: str, ref: str) -> bool:
+        """Whether commit_hash is in ref's history"""
+        raise NotImplementedError
+
     def get_commit_signature_email(self, commit_hash: str) -> Optional[str]:
         raise NotImplementedError
 
-    def list_ci_jobs(self) -> List[Dict[str, Any]]:
+    def list_ci_jobs(
+        self, scope: Optional[str] = None, per_page: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
         raise NotImplementedError
 
     def get_ci_artifact(self, job_id: str, artifact_path: str) -> str:
         raise NotImplementedError
 
-    def list_pushes(self) -> str:
+    def get_latest_ci_artifact(self, ref: str, job_name: str, artifact_path: str) -> str:
+        """Fetches an artifact from the latest successful job_name job on ref"""
+        raise NotImplementedError
+
+    def list_pushes(self) -> Iterator[Dict[str, Any]]:
         raise NotImplementedError
 
     def get_last_HEAD_commit(self, ref: str = "master") -> str:
         raise NotImplementedError
 
-    def list_branches(self) -> str:
+    def list_branches(self) -> Iterator[Dict[str, Any]]:
         raise NotImplementedError
 
     def get_branch(self, branch: str) -> str:
@@ -177,6 +233,19 @@ class StudentRepoBase(RepoBase):
     def new(cls, base_repo: str, semester: str, section: str, username: str) -> T:
         raise NotImplementedError
 
+    @classmethod
+    def fork(cls, base_repo, semester: str, section: str, username: str) -> T:
+        """Create this repo server-side as a copy of base_repo"""
+        raise NotImplementedError
+
+    @classmethod
+    def wait_for_imports(cls, repos: List[T], search: str = "") -> List[T]:
+        """Wait for forks to finish; returns the ones that failed"""
+        raise NotImplementedError
+
+    def detach_fork(self, branches: List[str]) -> None:
+        raise NotImplementedError
+
     @classmethod
     def build_name(cls, semester: str, section: str, assignment: str, user: str) -> str:
         raise NotImplementedError
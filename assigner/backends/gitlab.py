@@ -5,7 +5,9 @@ import logging
 import os
 import re
 import requests
-from time import sleep
+import shutil
+import threading
+from time import monotonic, sleep
 from typing import List, Optional
 
 from enum import Enum
@@ -29,6 +31,20 @@ from assigner.backends.gitlab_exceptions import (
 )
 
 from assigner.backends.git_exceptions import raiseRetryableGitError
+from assigner.backends.gitlab_mixins import (
+    GitlabDeletionMixin,
+    GitlabForkMixin,
+    GitlabHistoryMixin,
+)
+from assigner.backends.ratelimit import RateLimiter
+from assigner import parallel
+from assigner.cache import (
+    get_cache,
+    record_latency,
+    NAMESPACE_TTL,
+    PROJECT_TTL,
+    USER_TTL,
+)
 from assigner.backends.exceptions import (
     AssignerGroupNotFound,
     RetryableGitError,
@@ -36,8 +52,15 @@ from assigner.backends.exceptions import (
 )
 
 
-# Transparently use a common TLS session for each request
-requests = requests.Session()
+# Transparently use a common TLS session for each request. Sessions aren't
+# thread-safe, so each worker thread gets its own.
+_local = threading.local()
+
+
+def _session():
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+    return _local.session
 
 
 class Visibility(Enum):
@@ -56,11 +79,17 @@ class Access(Enum):
     owner = 50
 
 
-class GitlabRepo(RepoBase):
+class GitlabRepo(GitlabDeletionMixin, GitlabHistoryMixin, RepoBase):
     """Gitlab repo; manages API requests and various metadata"""
 
     PATH_RE = re.compile(r"^/(?P<namespace>[\w\-\.]+)/(?P<name>[\w\-\.]+)\.git$")
 
+    # Gitlab refuses to return more than 100 items per page
+    MAX_PER_PAGE = 100
+
+    # Number of items requested per page by list endpoints
+    per_page = MAX_PER_PAGE
+
     @classmethod
     def build_url(cls, config, namespace, name):
         """ Build a url for a repository """
@@ -100,50 +129,82 @@ class GitlabRepo(RepoBase):
 
         return self
 
+    # Number of times to retry a request that Gitlab throttled (HTTP 429)
+    THROTTLE_RETRIES = 5
+
+    @classmethod
+    def _cls_gl_request(cls, config, method, path, params={}, payload=None, url=None):
+        """Send a Gitlab API request, pacing it to stay under the rate limit"""
+        headers = {"Private-Token": config["token"]}
+        if url is None:
+            url = urljoin(config["host"], "/api/v4" + path)
+
+        limiter = RateLimiter.for_host(config["host"])
+        for _ in range(cls.THROTTLE_RETRIES):
+            limiter.acquire()
+            start = monotonic()
+            r = _session().request(
+                method, url, params=params, data=payload, headers=headers
+            )
+            record_latency(config["host"], "request", monotonic() - start)
+            limiter.update(r.headers, r.status_code)
+            if r.status_code != 429:
+                break
+            logging.debug("Gitlab throttled %s %s; retrying...", method, url)
+
+        r.raise_for_status()
+        return r
+
     @classmethod
     def _cls_gl_get(cls, config, path, params={}):
         """Make a Gitlab GET request"""
-        headers = {"Private-Token": config["token"]}
+        return cls._cls_gl_request(config, "GET", path, params).json()
+
+    @classmethod
+    def _cls_gl_get_paginated(cls, config, path, params={}, per_page=None):
+        """Lazily make Gitlab GET requests for every page of a list endpoint
+
+        Follows the ``Link`` header that Gitlab sends for both offset and
+        keyset pagination; pages are only requested as the caller consumes
+        the results, so stopping early avoids fetching the rest.
+        """
+        if per_page is None:
+            per_page = cls.per_page
+
+        params = dict(params)
+        params["per_page"] = max(1, min(per_page, cls.MAX_PER_PAGE))
+
         url = urljoin(config["host"], "/api/v4" + path)
-        r = requests.get(url, params=params, headers=headers)
-        r.raise_for_status()
-        return r.json()
+        while url:
+            r = cls._cls_gl_request(config, "GET", path, params, url=url)
+            yield from r.json()
+
+            # The next link already carries the query string
+            url = r.links.get("next", {}).get("url")
+            params = {}
 
     @classmethod
     def _cls_gl_get_raw(cls, config, path, params={}):
         """Make a Gitlab GET request whose response is not JSON"""
-        headers = {"Private-Token": config["token"]}
-        url = urljoin(config["host"], "/api/v4" + path)
-        r = requests.get(url, params=params, headers=headers)
-        r.raise_for_status()
+        r = cls._cls_gl_request(config, "GET", path, params)
         return r.content.decode("utf-8")
 
     @classmethod
     def _cls_gl_post(cls, config, path, payload={}, params={}):
         """Make a Gitlab POST request"""
-        headers = {"Private-Token": config["token"]}
-        url = urljoin(config["host"], "/api/v4" + path)
-        r = requests.post(url, params=params, data=payload, headers=headers)
-        r.raise_for_status()
-        return r.json()
+        return cls._cls_gl_request(config, "POST", path, params, payload).json()
 
     @classmethod
     def _cls_gl_put(cls, config, path, payload={}, params={}):
         """Make a Gitlab PUT request"""
-        headers = {"Private-Token": config["token"]}
-        url = urljoin(config["host"], "/api/v4" + path)
-        r = requests.put(url, params=params, data=payload, headers=headers)
-        r.raise_for_status()
-        return r.json()
+        return cls._cls_gl_request(config, "PUT", path, params, payload).json()
 
     @classmethod
     def _cls_gl_delete(cls, config, path, params={}):
         """Make a Gitlab DELETE request"""
-        headers = {"Private-Token": config["token"]}
-        url = urljoin(config["host"], "/api/v4" + path)
-        r = requests.delete(url, params=params, headers=headers)
-        r.raise_for_status()
-        return r.json()
+        r = cls._cls_gl_request(config, "DELETE", path, params)
+        # Some deletions answer with 204 No Content
+        return r.json() if r.content else None
 
     # pylint: disable=super-init-not-called
     def __init__(self, config, namespace, name, url=None):
@@ -162,25 +223,18 @@ class GitlabRepo(RepoBase):
 
     @property
     def namespace_id(self):
-        if not self.already_exists():
-            raise RepoError("Repo {} does not exist on Gitlab".format(self.name))
-
-        return self.info["namespace"]["id"]
+        return self.metadata["namespace_id"]
 
     @property
     def id(self):
-        if not self.already_exists():
-            raise RepoError("Repo {} does not exist on Gitlab".format(self.name))
-
-        return self.info["id"]
+        return self.metadata["id"]
 
     @property
     def info(self):
         if not hasattr(self, "_info"):
-            quoted = quote(self.name_with_namespace, safe="")
-            url = "/projects/{}".format(quoted)
+            url = self._api_path
             try:
-                self._info = self._gl_get(url)
+                self._remember(self._gl_get(url))
             except HTTPError as e:
                 if e.response.status_code == 404:
                     logging.debug(
@@ -193,6 +247,46 @@ class GitlabRepo(RepoBase):
                     raise
         return self._info
 
+    @property
+    def metadata(self):
+        """The parts of info that never change once a repo has been created
+
+        These are served from the metadata cache when possible, so they
+        don't cost a request.
+        """
+        if not hasattr(self, "_metadata"):
+            self._metadata = get_cache().get(self.config["host"], self._api_path)
+
+        if self._metadata is None:
+            if not self.already_exists():
+                raise RepoError("Repo {} does not exist on Gitlab".format(self.name))
+            self._remember(self.info)
+
+        return self._metadata
+
+    @property
+    def _api_path(self):
+        return "/projects/{}".format(quote(self.name_with_namespace, safe=""))
+
+    def _remember(self, info):
+        """Use info for this repo and cache the parts that never change"""
+        self._info = info
+        self._metadata = {
+            "id": info["id"],
+            "namespace_id": info["namespace"]["id"],
+            "ssh_url": info["ssh_url_to_repo"],
+        }
+        get_cache().set(
+            self.config["host"], self._api_path, self._metadata, PROJECT_TTL
+        )
+
+    def _forget(self):
+        """Drop everything we know about this repo, e.g. after deleting it"""
+        for attr in ("_info", "_metadata"):
+            if hasattr(self, attr):
+                delattr(self, attr)
+        get_cache().invalidate(self.config["host"], self._api_path)
+
     @property
     def repo(self):
         if hasattr(self, "_repo"):
@@ -202,16 +296,79 @@ class GitlabRepo(RepoBase):
 
     @property
     def ssh_url(self):
-        if not self.already_exists():
-            raise RepoError("Repo {} does not exist on Gitlab".format(self.name))
-
-        return self.info["ssh_url_to_repo"]
+        return self.metadata["ssh_url"]
 
     def already_exists(self):
         if self.info:
             return True
         return False
 
+    def is_empty(self):
+        return self.info.get("empty_repo", False)
+
+    @classmethod
+    def prefetch_info(cls, config, namespace, repos, search="", refresh=False):
+        """Fills in info for repos with one sweep of the namespace's projects
+
+        Repos missing from the namespace are marked as not existing. If
+        search is given, only projects whose name contains it are listed.
+        Unless refresh is set, the sweep is skipped when every repo's
+        metadata is already cached.
+        """
+        # A single project lookup is cheaper than listing the namespace
+        if len(repos) < 2:
+            return
+
+        if not refresh and all(repo.is_cached() for repo in repos):
+            logging.debug("Using cached metadata for all repos in %s.", namespace)
+            return
+
+        params = cls._group_projects_params(search)
+
+        path = "/groups/{}/projects".format(quote(namespace, safe=""))
+        try:
+            projects = {
+                project["path"]: project
+                for project in cls._cls_gl_get_paginated(config, path, params)
+            }
+        except HTTPError as e:
+            if e.response.status_code != 404:
+                raise
+            # Probably a user namespace; fall back to looking up each repo
+            logging.debug("Could not list projects in %s.", namespace)
+            return
+
+        logging.debug("Found %d projects in %s.", len(projects), namespace)
+        for repo in repos:
+            if repo.name in projects:
+                repo._remember(projects[repo.name])
+            else:
+                # Don't trust metadata cached before the repo went away
+                repo._forget()
+                repo._info = None
+                repo._metadata = None
+
+    # Gitlab only matches shorter search terms against whole names
+    MIN_SEARCH_LENGTH = 3
+
+    @classmethod
+    def _group_projects_params(cls, search):
+        """Parameters for listing a group's projects, narrowed by search
+
+        Short searches (e.g. for an assignment named "p1") would match
+        none of the students' projects, so we list them all instead.
+        """
+        params = {"with_shared": False}
+        if len(search) >= cls.MIN_SEARCH_LENGTH:
+            params["search"] = search
+        return params
+
+    def is_cached(self):
+        """Whether this repo's metadata can be used without a request"""
+        if not hasattr(self, "_metadata"):
+            self._metadata = get_cache().get(self.config["host"], self._api_path)
+        return self._metadata is not None
+
     def get_index(self):
         if self.repo is None:
             raise RepoError("No repo to get index from")
@@ -237,6 +394,13 @@ class GitlabRepo(RepoBase):
 
         self.repo.remote().pull(branch)
 
+    def merge_fetched(self, branch):
+        if self.repo is None:
+            raise RepoError("No repo to merge into")
+
+        # Unlike pull, this doesn't fetch again
+        self.repo.git.merge("{}/{}".format(self.repo.remote().name, branch))
+
     def clone_to(self, dir_name, branch, attempts=1):
         logging.debug("Cloning %s...", self.ssh_url)
         for attempt in range(0, attempts):
@@ -280,6 +444,40 @@ class GitlabRepo(RepoBase):
 
         return self._repo
 
+    def mirror_to(self, dir_name, branch):
+        try:
+            try:
+                self._repo = git.Repo(dir_name)
+            # pylint: disable=no-member
+            except (git.exc.NoSuchPathError, git.exc.InvalidGitRepositoryError):
+                logging.debug("Mirroring %s...", self.ssh_url)
+                shutil.rmtree(dir_name, ignore_errors=True)
+                self._repo = git.Repo.clone_from(self.ssh_url, dir_name, mirror=True)
+                changed = True
+            else:
+                logging.debug("Updating mirror of %s in %s...", self.name, dir_name)
+                self._repo.git.remote("set-url", "origin", self.ssh_url)
+                before = self._repo.git.for_each_ref()
+                self._repo.git.fetch("--prune", "origin")
+                changed = self._repo.git.for_each_ref() != before
+
+            if changed:
+                # Keep one pack with a reachability bitmap, so pushes to
+                # students reuse its deltas instead of compressing again
+                self._repo.git.repack("-a", "-d", "--write-bitmap-index")
+        # pylint: disable=no-member
+        except git.exc.GitCommandError as e:
+            raiseRetryableGitError(e)
+            raise RepoError(e) from e
+
+        heads = [h.name for h in self._repo.heads]
+        for b in branch or []:
+            if b not in heads:
+                raise BranchNotFound(b)
+
+        logging.debug("Mirrored %s.", self.name)
+        return self._repo
+
     def add_local_copy(self, dir_name):
         if self.repo is not None:
             logging.warning("You already have a local copy associated with this repo")
@@ -290,6 +488,7 @@ class GitlabRepo(RepoBase):
 
     def delete(self):
         self._gl_delete("/projects/{}".format(self.id))
+        self._forget()
         logging.debug("Deleted %s.", self.name)
 
     @classmethod
@@ -303,53 +502,115 @@ class GitlabRepo(RepoBase):
         }
         cls._cls_gl_post(config, "/groups", payload)
 
+    # Number of users to look up concurrently
+    USER_LOOKUP_JOBS = 8
+
     @classmethod
     def get_user_id(cls, username, config):
-        data = cls._cls_gl_get(config, "/users", params={"search": username})
+        user_ids = cls.get_user_ids([username], config)
 
-        if not data:
+        if username not in user_ids:
             logging.warning("Did not find any users matching %s.", username)
             raise RepoError("No user {}.".format(username))
 
-        for result in data:
-            if result["username"] == username:
-                logging.info("Got id %s for user %s.", data[0]["id"], username)
-                return result["id"]
+        logging.info("Got id %s for user %s.", user_ids[username], username)
+        return user_ids[username]
+
+    @classmethod
+    def get_user_ids(cls, usernames, config):
+        """Looks up the ids of many users at once by exact username
+
+        Users without an account are left out of the returned dict.
+        """
+        user_ids = {}
+        to_lookup = []
+        for username in dict.fromkeys(usernames):
+            user_id = get_cache().get(config["host"], cls._user_cache_path(username))
+            if user_id is not None:
+                user_ids[username] = user_id
+            else:
+                to_lookup.append(username)
+
+        def lookup(username):
+            data = cls._cls_gl_get(config, "/users", params={"username": username})
+            return data[0]["id"] if data else None
+
+        results = parallel.imap(lookup, to_lookup, cls.USER_LOOKUP_JOBS)
+        for username, user_id, error in results:
+            if error is not None:
+                raise error
+            if user_id is None:
+                logging.debug("No user has username %s.", username)
+                continue
+
+            user_ids[username] = user_id
+            get_cache().set(
+                config["host"], cls._user_cache_path(username), user_id, USER_TTL
+            )
+
+        return user_ids
 
-        # Fall back to first result if all else fails
-        logging.warning("Got %s users for %s.", len(data), username)
-        logging.warning("Failed to find an exact match for %s.", username)
-        logging.info("Got id %s for user %s.", data[0]["id"], data[0]["username"])
-        return data[0]["id"]
+    @staticmethod
+    def _user_cache_path(username):
+        return "/users?username={}".format(quote(username, safe=""))
 
     def list_members(self):
-        return self._gl_get("/projects/{}/members".format(self.id))
+        return self._gl_get_paginated("/projects/{}/members".format(self.id))
 
     def list_authorized_emails(self):
-        members = self._gl_get("/projects/{}/members/all".format(self.id))
+        members = self._gl_get_paginated("/projects/{}/members/all".format(self.id))
         authorized_users = [
             user for user in members if user["access_level"] >= Access.master.value
         ]
         emails = []
         for user in authorized_users:
-            full_user = self._gl_get("/users/{}".format(user["id"]))
-            if "public_email" in full_user:
-                emails.append(full_user["public_email"])
+            email = self.get_user_email(self.config, user["id"])
+            if email:
+                emails.append(email)
         return emails
 
+    # Public emails by (host, user id). Maintainers are mostly the same
+    # instructors and TAs, inherited from the group, in every repo.
+    _emails = {}  # type: dict
+    _emails_lock = threading.Lock()
+
+    @classmethod
+    def get_user_email(cls, config, user_id):
+        """Looks up a user's public email once per run (or cache TTL)"""
+        key = (config["host"], user_id)
+        with cls._emails_lock:
+            if key in cls._emails:
+                return cls._emails[key]
+
+        cache_path = "/users/{}/public_email".format(user_id)
+        email = get_cache().get(config["host"], cache_path)
+        if email is None:
+            user = cls._cls_gl_get(config, "/users/{}".format(user_id))
+            email = user.get("public_email") or ""
+            # Don't remember a missing email past this run; the user may
+            # make theirs public at any time
+            if email:
+                get_cache().set(config["host"], cache_path, email, USER_TTL)
+
+        with cls._emails_lock:
+            cls._emails[key] = email
+        return email
+
     def get_member(self, user_id):
         return self._gl_get("/projects/{}/members/{}".format(self.id, user_id))
 
     def get_member_add_date(self, user_id: str) -> str:
         params = {"project_id": self.id, "action": "joined", "sort": "asc"}
-        events = self._gl_get("/projects/{}/events".format(self.id), params)
-        user_events = [event for event in events if event["author_id"] == user_id]
-        if not user_events:
+        events = self._gl_get_paginated("/projects/{}/events".format(self.id), params)
+        user_event = next(
+            (event for event in events if event["author_id"] == user_id), None
+        )
+        if user_event is None:
             logging.warning(
                 "No project join events found for user, were they added to the repo?"
             )
             return ""
-        return user_events[0]["created_at"]
+        return user_event["created_at"]
 
     def add_member(self, user_id, level):
         payload = {"id": self.id, "user_id": user_id, "access_level": level.value}
@@ -378,11 +639,15 @@ class GitlabRepo(RepoBase):
         access = [Access(m["access_level"]) for m in self.list_members()]
         return all([a in (Access.guest, Access.reporter) for a in access])
 
-    def list_commits(self, ref_name="master", since=""):
+    def list_commits(self, ref_name="master", since="", until="", per_page=None):
         params = {"id": self.id, "ref_name": ref_name}
         if since:
             params["since"] = since
-        return self._gl_get("/projects/{}/repository/commits".format(self.id), params)
+        if until:
+            params["until"] = until
+        return self._gl_get_paginated(
+            "/projects/{}/repository/commits".format(self.id), params, per_page
+        )
 
     def list_commit_hashes(self, ref_name: str = "master", since="") -> List[str]:
         return [commit["id"] for commit in self.list_commits(ref_name, since)]
@@ -409,9 +674,13 @@ class GitlabRepo(RepoBase):
         except HTTPError:
             return None
 
-    def list_ci_jobs(self):
+    def list_ci_jobs(self, scope=None, per_page=None):
         params = {"id": self.id}
-        return self._gl_get("/projects/{}/jobs".format(self.id), params)
+        if scope:
+            params["scope"] = scope
+        return self._gl_get_paginated(
+            "/projects/{}/jobs".format(self.id), params, per_page
+        )
 
     def get_ci_artifact(self, job_id, artifact_path):
         params = {"id": self.id, "job_id": job_id, "artifact_path": artifact_path}
@@ -425,22 +694,23 @@ class GitlabRepo(RepoBase):
             raise e
 
     def list_pushes(self):
-        return self._gl_get("/projects/{}/events?action=pushed".format(self.id))
+        params = {"action": "pushed"}
+        return self._gl_get_paginated("/projects/{}/events".format(self.id), params)
 
     def get_last_HEAD_commit(self, ref="master"):
-        matching_pushes = list(
-            filter(lambda push: push["push_data"]["ref"] == ref, self.list_pushes())
-        )
-        commits = self.list_commits(ref)
+        HEAD = next(self.list_commits(ref), None)
 
-        if not commits:
+        if HEAD is None:
             return None
 
-        HEAD = commits[0]
+        latest_push = next(
+            filter(lambda push: push["push_data"]["ref"] == ref, self.list_pushes()),
+            None
+        )
         # Gitlab's commit created_at time uses the git metadata;
         # rather than trusting students, we get the time the commit was pushed at
-        if matching_pushes and HEAD['id'] == matching_pushes[0]['push_data']['commit_to']:
-            created_at = matching_pushes[0]['created_at']
+        if latest_push and HEAD['id'] == latest_push['push_data']['commit_to']:
+            created_at = latest_push['created_at']
 
             if created_at.endswith('Z'): # convert 'Z' to appropriate UTC offset
                 created_at = created_at[:-1] + "-0000"
@@ -458,12 +728,21 @@ class GitlabRepo(RepoBase):
         return HEAD
 
     def list_branches(self):
-        return self._gl_get("/projects/{}/repository/branches".format(self.id))
+        return self._gl_get_paginated(
+            "/projects/{}/repository/branches".format(self.id)
+        )
 
     def get_branch(self, branch):
-        return self._gl_get(
-            "/projects/{}/repository/branches/{}".format(self.id, branch)
-        )
+        try:
+            return self._gl_get(
+                "/projects/{}/repository/branches/{}".format(
+                    self.id, quote(branch, safe="")
+                )
+            )
+        except HTTPError as e:
+            if e.response.status_code == 404:
+                raise BranchNotFound(branch, e) from e
+            raise
 
     def archive(self):
         return self._gl_post("/projects/{}/archive".format(self.id))
@@ -496,6 +775,11 @@ class GitlabRepo(RepoBase):
     def _gl_get(self, path, params={}):
         return self.__class__._cls_gl_get(self.config, path, params)
 
+    def _gl_get_paginated(self, path, params={}, per_page=None):
+        return self.__class__._cls_gl_get_paginated(
+            self.config, path, params, per_page
+        )
+
     def _gl_get_raw(self, path, params={}):
         return self.__class__._cls_gl_get_raw(self.config, path, params)
 
@@ -512,7 +796,14 @@ class GitlabRepo(RepoBase):
 class GitlabTemplateRepo(GitlabRepo, TemplateRepoBase):
     @classmethod
     def new(cls, name, namespace, config):
-        namespaces = cls._cls_gl_get(config, "/namespaces", {"search": namespace})
+        cache_path = "/namespaces?search={}".format(quote(namespace, safe=""))
+        namespaces = get_cache().get(config["host"], cache_path)
+        if not namespaces:
+            namespaces = [
+                {"id": n["id"], "path": n["path"]}
+                for n in cls._cls_gl_get(config, "/namespaces", {"search": namespace})
+            ]
+            get_cache().set(config["host"], cache_path, namespaces, NAMESPACE_TTL)
 
         if len(namespaces) == 0:
             raise AssignerGroupNotFound("No groups matching {} were found on Gitlab".format(namespace))
@@ -553,12 +844,22 @@ class GitlabTemplateRepo(GitlabRepo, TemplateRepoBase):
         return cls.from_url(result["http_url_to_repo"], config["token"])
 
     def push_to(self, student_repo, branch="master"):
-        r = git.Remote.add(self.repo, student_repo.name, student_repo.ssh_url)
-        r.push(branch)
+        if isinstance(branch, str):
+            branch = [branch]
+
+        # Push straight to the URL; adding a remote per student would grow
+        # .git/config (and the cost of every later push) with the roster.
+        start = monotonic()
+        try:
+            self.repo.git.push(student_repo.ssh_url, *branch)
+        # pylint: disable=no-member
+        except git.exc.GitCommandError as e:
+            raise RepoError(e) from e
+        record_latency(self.config["host"], "push", monotonic() - start)
         logging.debug("Pushed %s to %s.", self.name, student_repo.name)
 
 
-class GitlabStudentRepo(GitlabRepo, StudentRepoBase):
+class GitlabStudentRepo(GitlabForkMixin, GitlabRepo, StudentRepoBase):
     """Repository for a student's solution to a homework assignment"""
 
     @classmethod
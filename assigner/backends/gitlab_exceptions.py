@@ -59,12 +59,13 @@ def raiseUserNotAssigned(err: HTTPError):
 
 def raiseRepositoryAlreadyExists(err: HTTPError):
     """
-    Request url:
+    Request urls:
         POST /api/v4/projects
+        POST /api/v4/projects/{}/fork
 
-    Expected response: HTTP 400
+    Expected response: HTTP 400 (create) or HTTP 409 (fork)
     """
-    if err.response.status_code != 400:
+    if err.response.status_code not in (400, 409):
         return
 
     raise RepositoryAlreadyExists(err)
@@ -73,6 +74,7 @@ def raiseCIArtifactNotFound(err: HTTPError):
     """
     Request url:
         GET /projects/{}/jobs/{}/artifacts/{}
+        GET /projects/{}/jobs/artifacts/{}/raw/{}?job={}
     """
 
     if err.response.status_code != 404:
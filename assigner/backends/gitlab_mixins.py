@@ -0,0 +1,201 @@
+import logging
+from time import monotonic, sleep
+
+from requests.exceptions import HTTPError
+from urllib.parse import quote
+
+from assigner.backends.base import RepoError
+from assigner.backends.gitlab_exceptions import (
+    raiseRepositoryAlreadyExists,
+    raiseCIArtifactNotFound,
+)
+
+
+class GitlabDeletionMixin:
+    """Waiting on Gitlab's background deletion of repos, for GitlabRepo"""
+
+    # Seconds to wait for Gitlab to finish deleting a repo
+    DELETE_TIMEOUT = 300
+
+    def wait_for_deletion(self):
+        """Blocks until Gitlab has removed this repo and its path is free
+
+        Gitlab deletes projects in the background; with delayed deletion
+        it only marks them, so those are removed permanently instead.
+        """
+        deadline = monotonic() + self.DELETE_TIMEOUT
+        delay = 0.5
+        removed = False
+
+        while True:
+            try:
+                info = self._gl_get(self._api_path)
+            except HTTPError as e:
+                if e.response.status_code == 404:
+                    logging.debug("%s has been deleted.", self.name)
+                    return
+                raise
+
+            marked = info.get("marked_for_deletion_on") or info.get("marked_for_deletion_at")
+            if marked and not removed:
+                logging.debug("%s is marked for deletion, removing it now...", self.name)
+                self._gl_delete(
+                    "/projects/{}".format(info["id"]),
+                    {"permanently_remove": True, "full_path": info["path_with_namespace"]},
+                )
+                removed = True
+
+            if monotonic() > deadline:
+                raise RepoError("Timed out waiting for {} to be deleted".format(self.name))
+            sleep(delay)
+            delay = min(delay * 2, 5)
+
+
+class GitlabHistoryMixin:
+    """Comparing refs and fetching CI artifacts by ref, for GitlabRepo"""
+
+    def compare(self, from_ref, to_ref):
+        params = {"from": from_ref, "to": to_ref}
+        comparison = self._gl_get(
+            "/projects/{}/repository/compare".format(self.id), params
+        )
+        files = set()
+        for diff in comparison["diffs"]:
+            files.add(diff["old_path"])
+            files.add(diff["new_path"])
+        return [commit["id"] for commit in comparison["commits"]], sorted(files)
+
+    def is_ancestor(self, commit_hash, ref):
+        params = {"refs[]": [commit_hash, ref]}
+        try:
+            merge_base = self._gl_get(
+                "/projects/{}/repository/merge_base".format(self.id), params
+            )
+        except HTTPError as e:
+            # The commit is gone, e.g. after a force push and garbage collection
+            if e.response.status_code in (400, 404):
+                return False
+            raise
+        return merge_base["id"] == commit_hash
+
+    def get_latest_ci_artifact(self, ref, job_name, artifact_path):
+        params = {"job": job_name}
+        try:
+            return self._gl_get_raw(
+                "/projects/{}/jobs/artifacts/{}/raw/{}".format(
+                    self.id, quote(ref, safe=""), quote(artifact_path.lstrip("/"))
+                ),
+                params,
+            )
+        except HTTPError as e:
+            raiseCIArtifactNotFound(e)
+            raise e
+
+
+class GitlabForkMixin:
+    """Creating student repos by forking the template, for GitlabStudentRepo"""
+
+    # Seconds to wait for Gitlab to finish importing forks
+    IMPORT_TIMEOUT = 600
+
+    @classmethod
+    def fork(cls, base_repo, semester, section, username):
+        """Create a new repository on GitLab by forking base_repo server-side"""
+        name = cls.build_name(semester, section, base_repo.name, username)
+        payload = {
+            "name": name,
+            "path": name,
+            "namespace_id": base_repo.namespace_id,
+            "visibility": "private",
+        }
+
+        try:
+            result = cls._cls_gl_post(
+                base_repo.config, "/projects/{}/fork".format(base_repo.id), payload
+            )
+        except HTTPError as e:
+            raiseRepositoryAlreadyExists(e)
+            raise e
+
+        repo = cls(base_repo.config, base_repo.namespace, name)
+        repo._remember(result)
+        return repo
+
+    @classmethod
+    def wait_for_imports(cls, repos, search=""):
+        """Wait for Gitlab to finish importing forked repos
+
+        Import statuses are polled for the whole namespace at once.
+        Returns the repos whose import failed.
+        """
+        pending = list(repos)
+        failed = []
+        deadline = monotonic() + cls.IMPORT_TIMEOUT
+        delay = 1
+
+        while pending:
+            statuses = cls._import_statuses(pending, search)
+
+            still_pending = []
+            for repo in pending:
+                status = statuses.get(repo.name)
+                if status is None:
+                    status = repo._gl_get(
+                        "/projects/{}/import".format(repo.id)
+                    )["import_status"]
+
+                if status == "failed":
+                    logging.debug("Import of %s failed.", repo.name)
+                    failed.append(repo)
+                elif status not in ("finished", "none"):
+                    still_pending.append(repo)
+            pending = still_pending
+
+            if pending:
+                if monotonic() > deadline:
+                    raise RepoError(
+                        "Timed out waiting for {} repos to import".format(len(pending))
+                    )
+                logging.debug("Waiting for %d repos to import...", len(pending))
+                sleep(delay)
+                delay = min(delay * 2, 10)
+
+        return failed
+
+    @classmethod
+    def _import_statuses(cls, repos, search):
+        config = repos[0].config
+        namespace = repos[0].namespace
+        params = cls._group_projects_params(search)
+
+        path = "/groups/{}/projects".format(quote(namespace, safe=""))
+        try:
+            return {
+                project["path"]: project.get("import_status")
+                for project in cls._cls_gl_get_paginated(config, path, params)
+            }
+        except HTTPError as e:
+            if e.response.status_code != 404:
+                raise
+            # Not a group; check on each repo instead
+            return {}
+
+    def detach_fork(self, branches):
+        """Make a finished fork look like it had been pushed to
+
+        Removes the fork relationship and any branches other than
+        the requested ones.
+        """
+        self._gl_delete("/projects/{}/fork".format(self.id))
+
+        if self.info["default_branch"] not in branches:
+            self._gl_put("/projects/{}".format(self.id), {"default_branch": branches[0]})
+
+        for b in list(self.list_branches()):
+            if b["name"] not in branches:
+                self._gl_delete(
+                    "/projects/{}/repository/branches/{}".format(
+                        self.id, quote(b["name"], safe="")
+                    )
+                )
+                logging.debug("Deleted branch %s from %s.", b["name"], self.name)
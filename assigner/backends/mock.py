@@ -3,7 +3,7 @@ import git
 import logging
 import re
 from unittest.mock import MagicMock
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 from enum import Enum
 from requests.exceptions import HTTPError
@@ -127,6 +127,16 @@ class MockRepo(RepoBase):
             return True
         return False
 
+    def is_cached(self):
+        return self.already_exists()
+
+    def is_empty(self):
+        return False
+
+    @classmethod
+    def prefetch_info(cls, config, namespace, repos, search="", refresh=False):
+        logging.debug("Prefetched info for %d repos", len(repos))
+
     def get_head(self, branch):
         if self.repo is None:
             raise RepoError("No repo to get head from")
@@ -144,6 +154,10 @@ class MockRepo(RepoBase):
         if self.repo is None:
             raise RepoError("No repo to pull to")
 
+    def merge_fetched(self, branch):
+        if self.repo is None:
+            raise RepoError("No repo to merge into")
+
     def clone_to(self, dir_name, branch=None, attempts=1):
         logging.debug("Cloning %s...", self.ssh_url)
         if branch:
@@ -158,6 +172,9 @@ class MockRepo(RepoBase):
         logging.debug("Cloned %s.", self.name)
         return self._repo
 
+    def mirror_to(self, dir_name, branch):
+        return self.clone_to(dir_name, branch)
+
     def add_local_copy(self, dir_name):
         if self.repo is not None:
             logging.warning("You already have a local copy associated with this repo")
@@ -169,6 +186,9 @@ class MockRepo(RepoBase):
     def delete(self):
         logging.debug("Deleted %s.", self.name)
 
+    def wait_for_deletion(self):
+        pass
+
     @classmethod
     def create_group(cls, group, config) -> None:
         logging.debug("Created group %s", group)
@@ -180,6 +200,10 @@ class MockRepo(RepoBase):
         logging.info("Got id %i for user %s.", id, username)
         return id
 
+    @classmethod
+    def get_user_ids(cls, usernames, config):
+        return {username: cls.get_user_id(username, config) for username in usernames}
+
     def list_members(self):
         return [MagicMock(), MagicMock(), MagicMock()]
 
@@ -201,7 +225,7 @@ class MockRepo(RepoBase):
     def delete_member(self, user_id):
         return MagicMock()
 
-    def list_commits(self, ref_name="master", since=""):
+    def list_commits(self, ref_name="master", since="", until="", per_page=None):
         return MagicMock()
 
     def list_commit_hashes(self, ref_name: str = "master", since="") -> List[str]:
@@ -210,15 +234,24 @@ class MockRepo(RepoBase):
     def list_commit_files(self, commit_hash: str) -> List[str]:
         return MagicMock()
 
+    def compare(self, from_ref: str, to_ref: str) -> Tuple[List[str], List[str]]:
+        return [], []
+
+    def is_ancestor(self, commit_hash: str, ref: str) -> bool:
+        return True
+
     def get_commit_signature_email(self, commit_hash: str) -> Optional[str]:
         return MagicMock()
 
-    def list_ci_jobs(self):
+    def list_ci_jobs(self, scope=None, per_page=None):
         return MagicMock()
 
     def get_ci_artifact(self, job_id, artifact_path):
         return MagicMock()
 
+    def get_latest_ci_artifact(self, ref, job_name, artifact_path):
+        return MagicMock()
+
     def list_pushes(self):
         return MagicMock()
 
@@ -268,6 +301,17 @@ class MockStudentRepo(MockRepo, StudentRepoBase):
         """Create a new repository on GitLab"""
         return cls.from_url("http://mockhub.com/", "token")
 
+    @classmethod
+    def fork(cls, base_repo, semester, section, username):
+        return cls.from_url("http://mockhub.com/", "token")
+
+    @classmethod
+    def wait_for_imports(cls, repos, search=""):
+        return []
+
+    def detach_fork(self, branches):
+        logging.debug("Detached %s from its template", self.name)
+
     @classmethod
     def build_name(cls, semester, section, assignment, user):
         fmt = {
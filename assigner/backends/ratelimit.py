@@ -0,0 +1,143 @@
+import atexit
+import logging
+import threading
+import time
+
+from email.utils import parsedate_to_datetime
+from typing import Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """
+    Token bucket that paces requests to a single host.
+
+    The bucket is refilled from the ``RateLimit-*`` headers the server sends
+    with every response, so its idea of how many requests are left always
+    follows the server's. While plenty of tokens remain requests go out
+    immediately; once fewer than ``low_water`` are left, the remaining tokens
+    are spread evenly over the time left in the window so we never run dry.
+    ``Retry-After`` (sent with 429s) blocks every request until it passes.
+    """
+
+    _limiters = {}  # type: dict
+    _limiters_lock = threading.Lock()
+
+    def __init__(self, low_water: int = 10, clock=time.monotonic, sleep=time.sleep):
+        self.low_water = low_water
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+
+        self.remaining = None  # type: Optional[int]
+        self.reset_at = None  # type: Optional[float]
+        self.blocked_until = 0.0
+        self._next_slot = 0.0
+
+        # Metrics
+        self.requests = 0
+        self.waits = 0
+        self.waited = 0.0
+        self.throttled = 0
+
+    @classmethod
+    def for_host(cls, host: str) -> "RateLimiter":
+        """Returns the limiter shared by every request to host"""
+        with cls._limiters_lock:
+            if host not in cls._limiters:
+                cls._limiters[host] = cls()
+            return cls._limiters[host]
+
+    def acquire(self) -> float:
+        """Blocks until a request may be sent; returns the time spent waiting"""
+        with self._lock:
+            now = self._clock()
+            start = max(now, self.blocked_until)
+
+            if self.remaining is not None and self.reset_at is not None:
+                if self.reset_at <= start:
+                    # The window has rolled over; we'll learn the new
+                    # budget from the next response.
+                    self.remaining = None
+                elif self.remaining <= 0:
+                    # Hold every caller, not just this one, until the reset;
+                    # we won't know the new budget until a response arrives.
+                    self.blocked_until = max(self.blocked_until, self.reset_at)
+                    start = self.reset_at
+                    self.remaining = None
+                elif self.remaining <= self.low_water:
+                    interval = (self.reset_at - start) / self.remaining
+                    start = max(start, self._next_slot)
+                    self._next_slot = start + interval
+                    self.remaining -= 1
+                else:
+                    self.remaining -= 1
+
+            delay = start - now
+            self.requests += 1
+            if delay > 0:
+                self.waits += 1
+                self.waited += delay
+
+        if delay > 0:
+            logger.debug("Waiting %.2f seconds for the rate limit...", delay)
+            self._sleep(delay)
+            return delay
+        return 0.0
+
+    def update(self, headers: Mapping[str, str], status_code: int = 200) -> None:
+        """Refills the bucket from a response's rate limiting headers"""
+        remaining = _parse_int(headers.get("RateLimit-Remaining"))
+        reset = _parse_int(headers.get("RateLimit-Reset"))
+        retry_after = _parse_retry_after(headers.get("Retry-After"))
+
+        with self._lock:
+            now = self._clock()
+            if remaining is not None:
+                self.remaining = remaining
+            if reset is not None:
+                # RateLimit-Reset is a unix timestamp; translate it to our clock
+                self.reset_at = now + max(0.0, reset - time.time())
+
+            if status_code == 429:
+                self.throttled += 1
+                if retry_after is None:
+                    retry_after = 1.0
+            if retry_after is not None:
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+
+    def summary(self) -> str:
+        return "{} requests, {} delayed for {:.1f}s total, {} throttled".format(
+            self.requests, self.waits, self.waited, self.throttled
+        )
+
+
+def _parse_int(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After may be either a number of seconds or an HTTP date"""
+    if value is None:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+@atexit.register
+def _log_summaries() -> None:
+    for host, limiter in RateLimiter._limiters.items():
+        if limiter.requests and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Rate limiting for %s: %s", host, limiter.summary())
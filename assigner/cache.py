@@ -0,0 +1,181 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from typing import Any, Optional
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Lifetimes (in seconds) for the kinds of things we cache
+DAY = 24 * 60 * 60
+PROJECT_TTL = 7 * DAY
+NAMESPACE_TTL = 30 * DAY
+USER_TTL = 30 * DAY
+LATENCY_TTL = 90 * DAY
+CHECKPOINT_TTL = 180 * DAY
+
+# How many past samples recorded latencies are weighted as, so that they
+# follow changes to the server instead of averaging over all of history
+LATENCY_HISTORY = 1000
+
+
+def cache_dir() -> str:
+    cache_home = os.environ.get(
+        "XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")
+    )
+    return os.path.join(cache_home, "assigner")
+
+
+def default_path() -> str:
+    return os.path.join(cache_dir(), "metadata.sqlite")
+
+
+def mirror_path(host: str, namespace: str, name: str) -> Optional[str]:
+    """
+    Where to keep the local mirror of a template repo between runs, or None
+    if caching is disabled.
+    """
+    if _disabled:
+        return None
+    host = urlsplit(host).netloc or host or "local"
+    return os.path.join(cache_dir(), "templates", host, namespace, name + ".git")
+
+
+class MetadataCache:
+    """
+    On-disk cache for backend metadata that (almost) never changes, such as
+    project IDs, namespace IDs, and user IDs. Entries are keyed by the host
+    and the API path they were looked up from and expire after a TTL.
+    """
+
+    def __init__(self, filename: str):
+        os.makedirs(os.path.dirname(filename), mode=0o700, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(filename, check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS metadata ("
+                "host TEXT NOT NULL, path TEXT NOT NULL, value TEXT NOT NULL, "
+                "expires REAL NOT NULL, PRIMARY KEY (host, path))"
+            )
+
+    def get(self, host: str, path: str, default: Any = None) -> Any:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, expires FROM metadata WHERE host = ? AND path = ?",
+                (host, path),
+            ).fetchone()
+
+        if row is None:
+            return default
+
+        value, expires = row
+        if expires < time.time():
+            self.invalidate(host, path)
+            return default
+
+        logger.debug("Cache hit for %s%s.", host, path)
+        return json.loads(value)
+
+    def set(self, host: str, path: str, value: Any, ttl: float) -> None:
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO metadata VALUES (?, ?, ?, ?)",
+                (host, path, json.dumps(value), time.time() + ttl),
+            )
+
+    def invalidate(self, host: str, path: str) -> None:
+        with self._lock, self._db:
+            self._db.execute(
+                "DELETE FROM metadata WHERE host = ? AND path = ?", (host, path)
+            )
+
+
+class NullCache:
+    """Stands in for MetadataCache when caching is disabled"""
+
+    # pylint: disable=unused-argument
+    def get(self, host: str, path: str, default: Any = None) -> Any:
+        return default
+
+    def set(self, host: str, path: str, value: Any, ttl: float) -> None:
+        pass
+
+    def invalidate(self, host: str, path: str) -> None:
+        pass
+
+
+_cache = None
+_cache_lock = threading.Lock()
+_disabled = False
+
+
+def disable() -> None:
+    """Stop consulting (or updating) the on-disk caches for this run"""
+    # pylint: disable=global-statement
+    global _cache, _disabled
+    with _cache_lock:
+        _cache = NullCache()
+        _disabled = True
+
+
+def get_cache():
+    # pylint: disable=global-statement
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = MetadataCache(default_path())
+            except (OSError, sqlite3.Error) as e:
+                logger.warning("Unable to open metadata cache: %s", e)
+                _cache = NullCache()
+        return _cache
+
+
+_latencies = {}  # type: dict
+_latencies_lock = threading.Lock()
+
+
+def _latency_path(kind: str) -> str:
+    return "/latency/{}".format(kind)
+
+
+def record_latency(host: str, kind: str, seconds: float) -> None:
+    """Notes how long one operation (e.g. a request or a push) took"""
+    with _latencies_lock:
+        count, total = _latencies.get((host, kind), (0, 0.0))
+        _latencies[(host, kind)] = (count + 1, total + seconds)
+
+
+def latency(host: str, kind: str) -> Optional[float]:
+    """The average time recorded for one kind of operation against host"""
+    stored = get_cache().get(host, _latency_path(kind))
+    with _latencies_lock:
+        count, total = _latencies.get((host, kind), (0, 0.0))
+
+    if stored is not None:
+        history = min(stored["count"], LATENCY_HISTORY)
+        count += history
+        total += stored["mean"] * history
+
+    return total / count if count else None
+
+
+def save_latencies() -> None:
+    """Folds the latencies recorded during this run into the cache"""
+    with _latencies_lock:
+        recorded = list(_latencies.items())
+        _latencies.clear()
+
+    for (host, kind), (count, total) in recorded:
+        stored = get_cache().get(host, _latency_path(kind)) or {"count": 0, "mean": 0.0}
+        history = min(stored["count"], LATENCY_HISTORY)
+        mean = (stored["mean"] * history + total) / (history + count)
+        get_cache().set(
+            host, _latency_path(kind), {"count": history + count, "mean": mean}, LATENCY_TTL
+        )
@@ -0,0 +1,155 @@
+import logging
+import threading
+import time
+
+from typing import Any, Dict, List, Tuple
+from urllib.parse import urljoin
+
+import requests
+
+from redkyn import canvas
+from redkyn.canvas.exceptions import raiseCourseNotFound
+from requests.exceptions import HTTPError
+
+from assigner.exceptions import AssignerException
+
+logger = logging.getLogger(__name__)
+
+# redkyn shares one session between every request, but sessions aren't
+# thread-safe, so each worker thread gets its own.
+_local = threading.local()
+
+
+def _session():
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+    return _local.session
+
+
+class CanvasProgressFailed(AssignerException):
+    """ A Canvas background job failed or did not finish in time. """
+
+
+class CanvasAPI(canvas.CanvasAPI):
+    """
+    CanvasAPI with the endpoints assigner needs that redkyn's doesn't
+    provide, such as bulk grade updates, whose requests can be sent from
+    several threads at once.
+    """
+
+    # Seconds to wait for Canvas to finish a background job
+    PROGRESS_TIMEOUT = 300
+
+    def _request(
+        self, method: str, url: str, attempts: int = 5, **kwargs: Any
+    ) -> requests.Response:
+        """Sends a request, retrying server errors as redkyn does"""
+        url = urljoin(self.website_root, url)
+        tries = 0
+        while True:
+            try:
+                r = _session().request(method, url, headers=self.REQUEST_HEADER, **kwargs)
+                r.raise_for_status()
+                return r
+            except HTTPError as e:
+                if e.response is None or e.response.status_code < 500:
+                    raise
+
+                tries += 1
+                if tries == attempts:
+                    raise
+
+                logger.debug(
+                    "Caught %d exception in request after %d tries. Will retry %d more times.",
+                    e.response.status_code,
+                    tries,
+                    attempts - tries,
+                    exc_info=True,
+                )
+                time.sleep(0.5 * 2 ** (tries - 1))
+
+    def _get_request(
+        self, url: str, params: dict = None, attempts: int = 5
+    ) -> Tuple[Any, str]:
+        r = self._request("GET", url, attempts, params=params)
+        return r.json(), r.headers.get("Link", "")
+
+    def _put_request(
+        self, url: str, params: dict = None, attempts: int = 5
+    ) -> Tuple[Any, str]:
+        r = self._request("PUT", url, attempts, params=params)
+        return r.json(), r.headers.get("Link", "")
+
+    def _post_request(
+        self, url: str, payload: Dict[str, Any], attempts: int = 5
+    ) -> Dict[str, Any]:
+        return self._request("POST", url, attempts, json=payload).json()
+
+    def get_assignment(self, course_id: str, assignment_id: str) -> Dict[str, Any]:
+        try:
+            result, _ = self._get_request(
+                "/api/v1/courses/%s/assignments/%s" % (course_id, assignment_id)
+            )
+            return result
+        except HTTPError as e:
+            raiseCourseNotFound(e)
+            raise
+
+    def get_assignment_submissions(
+        self, course_id: str, assignment_id: str
+    ) -> List[Dict[str, Any]]:
+        """Lists every student's submission for an assignment"""
+        try:
+            return self._get_all_pages(
+                "/api/v1/courses/%s/assignments/%s/submissions" % (course_id, assignment_id),
+                {"per_page": 100},
+            )
+        except HTTPError as e:
+            raiseCourseNotFound(e)
+            raise
+
+    def update_grades(
+        self, course_id: str, assignment_id: str, grades: Dict[str, str]
+    ) -> Dict[str, Any]:
+        """
+        Sets many students' grades for an assignment in one request
+        :param grades: a map of Canvas student IDs onto the grades to post
+        :return: the Canvas progress object for the update
+        """
+        payload = {
+            "grade_data": {
+                str(student_id): {"posted_grade": grade}
+                for student_id, grade in grades.items()
+            }
+        }
+        try:
+            return self._post_request(
+                "/api/v1/courses/%s/assignments/%s/submissions/update_grades"
+                % (course_id, assignment_id),
+                payload,
+            )
+        except HTTPError as e:
+            raiseCourseNotFound(e)
+            raise
+
+    def wait_for_progress(self, progress: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Polls a Canvas progress object until its job has finished
+        :return: the finished progress object
+        """
+        deadline = time.monotonic() + self.PROGRESS_TIMEOUT
+        delay = 0.5
+        while progress["workflow_state"] in ("queued", "running"):
+            if time.monotonic() > deadline:
+                raise CanvasProgressFailed(
+                    "Timed out waiting for Canvas job {}".format(progress["id"])
+                )
+            time.sleep(delay)
+            delay = min(delay * 2, 5)
+            progress, _ = self._get_request("/api/v1/progress/%s" % progress["id"])
+
+        if progress["workflow_state"] == "failed":
+            raise CanvasProgressFailed(
+                "Canvas job {} failed: {}".format(progress["id"], progress.get("message"))
+            )
+        return progress
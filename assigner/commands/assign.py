@@ -4,20 +4,40 @@ import time
 
 from assigner.backends.base import RepoError
 from assigner.backends.decorators import requires_config_and_backend
+from assigner.ssh import requires_multiplexed_ssh
 from assigner.backends.exceptions import (
     RepositoryAlreadyExists,
     BranchNotFound,
 )
 from assigner.commands.open import open_assignment
-from assigner import progress
-from assigner.roster_util import get_filtered_roster
+from assigner import cache, parallel, progress
+from assigner.plan import Plan, pages
+from assigner.roster_util import (
+    build_student_repo,
+    build_student_repos,
+    get_filtered_roster,
+)
 
 help = "Assign a template repo to students"
 
 logger = logging.getLogger(__name__)
 
+# What assign needs to do to each student's repo
+CREATE = "create"
+RECREATE = "recreate"
+PUSH = "push"
+PROTECT = "protect"
+SKIP = "skip"
+
+
+@requires_multiplexed_ssh
 @requires_config_and_backend
 def assign(conf, backend, args):
+    _assign(conf, backend, args)
+
+
+# Sans decorator to ease testing
+def _assign(conf, backend, args):
     """Creates homework repositories for an assignment for each student
     in the roster.
     """
@@ -28,6 +48,7 @@ def assign(conf, backend, args):
         branch = ["master"]
     dry_run = args.dry_run
     force = args.force
+    fork = args.fork
     namespace = conf.namespace
     semester = conf.semester
     backend_conf = conf.backend
@@ -36,6 +57,12 @@ def assign(conf, backend, args):
 
     actual_count = 0  # Represents the number of repos actually pushed to
     student_count = len(roster)
+    failures = []
+
+    # Forks are created server-side, so we only need a local copy of the
+    # template if we're pushing to repos that already exist (reconciling
+    # pushes to any that are empty)
+    needs_clone = not fork or args.branch or args.reconcile
 
     with tempfile.TemporaryDirectory() as tmpdirname:
         print("Assigning '{}' to {} student{} in {}.".format(
@@ -46,7 +73,14 @@ def assign(conf, backend, args):
         template = backend.template_repo(backend_conf, namespace, hw_name)
         if not dry_run:
             try:
-                template.clone_to(tmpdirname, branch)
+                mirror = cache.mirror_path(backend_conf.get("host", ""), namespace, hw_name)
+                if needs_clone and mirror:
+                    template.mirror_to(mirror, branch)
+                elif needs_clone:
+                    template.clone_to(tmpdirname, branch)
+                else:
+                    for b in branch:
+                        template.get_branch(b)
             except BranchNotFound as e:
                 logging.error("Cound not find branch %s in base repository", e.args[0])
                 logging.debug(e)
@@ -61,71 +95,209 @@ def assign(conf, backend, args):
         if force:
             logging.warning("Repos will be overwritten.")
 
-        for i, student in progress.enumerate(roster):
-            username = student["username"]
-            student_section = student["section"]
-            full_name = backend.student_repo.build_name(semester, student_section,
-                                                        hw_name, username)
-            repo = backend.student_repo(backend_conf, namespace, full_name)
+        if fork:
+            create = backend.student_repo.fork
+        else:
+            create = backend.student_repo.new
+
+        if dry_run:
+            repos = [build_student_repo(conf, backend, hw_name, s) for s in roster]
+            print_plan(args, backend_conf.get("host", ""), repos, branch)
+            return
+
+        repos = build_student_repos(conf, backend, hw_name, roster, refresh=True)
 
+        def plan(repo):
+            """Decides what needs to happen to a student's repo and which
+            branches to push to it
+            """
             if not repo.already_exists():
-                if not dry_run:
-                    repo = backend.student_repo.new(template, semester, student_section,
-                                                    username)
-                    repo.push(template, branch)
-                    for b in branch:
-                        repo.protect(b)
-                actual_count += 1
-                logging.debug("Assigned.")
-            elif force:
-                logging.info("%s: Already exists, deleting...", full_name)
-                if not dry_run:
-                    repo.delete()
-
-                    # Gitlab will throw a 400 if you delete and immediately
-                    # recreate a repo. We retry w/ exponential backoff up
-                    # to 5 times
-                    wait = 0.1
-                    retries = 0
-                    while True:
-                        try:
-                            repo = backend.student_repo.new(
-                                template, semester, student_section, username
-                            )
-                            logger.debug("Success!")
-                            break
-                        except RepositoryAlreadyExists as e:
-                            if retries >= 5:
-                                logger.debug("Critical Failure!")
-                                raise
-                            logger.debug("Failed, retrying...")
-                            logger.debug(e)
-
-                        # Delay and try again
-                        time.sleep(wait * 2**retries)
-                        retries += 1
-
-                    repo.push(template, branch)
-                    for b in branch:
-                        repo.protect(b)
-                actual_count += 1
-                logging.debug("Assigned.")
-            elif args.branch:
-                logging.info("%s: Already exists.", full_name)
+                return CREATE, branch
+            if force:
+                logging.info("%s: Already exists, deleting...", repo.name)
+                return RECREATE, branch
+            if args.reconcile:
+                return reconcile(repo, branch)
+            if args.branch:
                 # If we have an explicit branch, push anyways
-                if not dry_run:
-                    repo.push(template, branch)
+                logging.info("%s: Already exists.", repo.name)
+                return PUSH, branch
+            logging.info("%s: Already exists, skipping...", repo.name)
+            return SKIP, []
+
+        # Reconciling may have to look at each repo's branches
+        work = []
+        plans = parallel.imap(lambda i: plan(repos[i]), range(len(repos)), args.jobs)
+        for i, planned, error in sorted(plans, key=lambda p: p[0]):
+            if error is not None:
+                failures.append((roster[i], error))
+            else:
+                work.append((roster[i], repos[i]) + planned)
+
+        # Delete every repo we're replacing up front, so Gitlab works through
+        # the deletions while we get on with the rest
+        doomed = [item for item in work if item[2] == RECREATE]
+        if doomed:
+            print("Deleting {} repositories...".format(len(doomed)))
+            for item, _, error in parallel.imap(lambda item: item[1].delete(), doomed, args.jobs):
+                if error is not None:
+                    failures.append((item[0], error))
+                    work.remove(item)
+
+        # Forks aren't ready for pushing, protecting, or opening until
+        # Gitlab has finished importing them
+        def is_pending_fork(action):
+            return fork and action in (CREATE, RECREATE)
+
+        def create_stage(item, _):
+            student, repo, action, _ = item
+            if action == CREATE:
+                repo = create(template, semester, student["section"], student["username"])
+            elif action == RECREATE:
+                repo = recreate(create, repo, template, semester, student)
+            return repo, action
+
+        def push_stage(item, value):
+            repo, action = value
+            if action in (CREATE, RECREATE, PUSH) and not is_pending_fork(action):
+                repo.push(template, item[3])
+            return value
+
+        def protect_stage(item, value):
+            student = item[0]
+            repo, action = value
+            if not is_pending_fork(action):
+                if action != SKIP:
                     for b in branch:
                         repo.protect(b)
+                    logging.debug("Assigned.")
+                if args.open:
+                    open_assignment(repo, student, backend.access.developer)
+            return value
+
+        # Creating and protecting repos are API calls; pushing goes over
+        # SSH. Each stage gets its own workers so they overlap.
+        pipeline = parallel.Pipeline(
+            (create_stage, args.jobs),
+            (push_stage, args.push_jobs),
+            (protect_stage, args.jobs),
+        )
+
+        forks = []
+        results = pipeline.imap(work)
+        for (student, _, _, _), value, error in progress.iterate(results, len(work)):
+            if error is not None:
+                failures.append((student, error))
+                continue
+
+            repo, action = value
+            if is_pending_fork(action):
+                forks.append((student, repo))
+            elif action != SKIP:
                 actual_count += 1
+
+        if forks:
+            print("Waiting for {} repositories to be created...".format(len(forks)))
+            failed = backend.student_repo.wait_for_imports(
+                [repo for _, repo in forks], hw_name
+            )
+
+            def finish_fork(student_repo):
+                student, repo = student_repo
+                if repo in failed:
+                    raise RepoError("Could not be created from the template")
+
+                repo.detach_fork(branch)
+                for b in branch:
+                    repo.protect(b)
                 logging.debug("Assigned.")
-            else:
-                logging.info("%s: Already exists, skipping...", full_name)
-            i += 1
+                if args.open:
+                    open_assignment(repo, student, backend.access.developer)
+
+            for (student, _), _, error in parallel.imap(finish_fork, forks, args.jobs):
+                if error is not None:
+                    failures.append((student, error))
+                else:
+                    actual_count += 1
+
+    print_assigned(hw_name, actual_count)
+
+    if failures:
+        logging.error("Failed to assign %d repositories:", len(failures))
+        for student, error in failures:
+            logging.error("  %s: %s", student["username"], error)
+            logging.debug("Traceback for %s:", student["username"], exc_info=error)
+
+
+def print_plan(args, host, repos, branch):
+    """Reports what assign would do without making any requests
+
+    Repos we have no cached metadata for are assumed not to exist yet.
+    """
+    plan = Plan(host)
+    plan.add_requests(pages(len(repos)))  # Listing the existing repos
+
+    protecting = len(branch)
+    opening = 1 if args.open else 0
+    pushes = 0 if args.fork else 1
+    for repo in repos:
+        if not repo.is_cached():
+            # Forking also detaches the fork from the template
+            creating = 2 if args.fork else 1
+            plan.add(CREATE, creating + protecting + opening, pushes)
+        elif args.force:
+            # Deleting, waiting for the deletion, and creating again
+            creating = 4 if args.fork else 3
+            plan.add(RECREATE, creating + protecting + opening, pushes)
+        elif args.reconcile:
+            # We can't tell what's missing without looking
+            plan.add("check", 1)
+        elif args.branch:
+            plan.add(PUSH, protecting + opening, 1)
+        else:
+            plan.add(SKIP, opening)
+
+    print("Planned changes (repos not in the cache are assumed to be new):")
+    plan.report(args.jobs, args.push_jobs)
+
+
+def reconcile(repo, branches):
+    """Decides what an existing repo is missing and which branches to push
+
+    The project listing we already have says whether a repo is empty;
+    otherwise we look at its branches.
+    """
+    if repo.is_empty():
+        logging.info("%s: Already exists but is empty.", repo.name)
+        return PUSH, branches
+
+    existing = {b["name"]: b["protected"] for b in repo.list_branches()}
+    missing = [b for b in branches if b not in existing]
+    if missing:
+        logging.info("%s: Missing %s.", repo.name, ", ".join(missing))
+        return PUSH, missing
+    unprotected = [b for b in branches if not existing[b]]
+    if unprotected:
+        logging.info("%s: %s not protected.", repo.name, ", ".join(unprotected))
+        return PROTECT, []
+    logging.info("%s: Up to date, skipping...", repo.name)
+    return SKIP, []
+
+
+def recreate(create, repo, template, semester, student):
+    """Creates a student's repo again once Gitlab has finished deleting it"""
+    repo.wait_for_deletion()
+    try:
+        return create(template, semester, student["section"], student["username"])
+    except RepositoryAlreadyExists as e:
+        # The name can stay reserved for a moment after the project is gone
+        logger.debug("%s: Not free yet, retrying...", repo.name)
+        logger.debug(e)
+        time.sleep(1)
+        return create(template, semester, student["section"], student["username"])
 
-            if args.open:
-                open_assignment(repo, student, backend.access.developer)
 
+def print_assigned(hw_name, actual_count):
     print("Assigned '{}' to {} student{}.".format(
         hw_name,
         actual_count,
@@ -148,9 +320,22 @@ def setup_parser(parser):
                         help="ID of the student to assign to.")
     parser.add_argument("--dry-run", action="store_true",
                         help="Don't actually do it.")
-    parser.add_argument("-f", "--force", action="store_true", dest="force",
-                        help="Delete and recreate already existing "
-                        "student repos.")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("-f", "--force", action="store_true", dest="force",
+                      help="Delete and recreate already existing "
+                      "student repos.")
+    mode.add_argument("--reconcile", action="store_true",
+                      help="Only fix what's missing: create missing repos, push to "
+                      "empty repos or ones missing a branch, and protect "
+                      "unprotected branches")
     parser.add_argument("-o", "--open", action="store_true", dest="open",
                         help="Open assignment after assigning")
+    parser.add_argument("--fork", action="store_true",
+                        help="Create student repos on the server by forking the "
+                        "template instead of pushing to each one")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="Number of concurrent API requests (creating, "
+                        "protecting, and opening repos)")
+    parser.add_argument("--push-jobs", type=int, default=1,
+                        help="Number of concurrent pushes to student repos")
     parser.set_defaults(run=assign)
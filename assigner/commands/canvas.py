@@ -8,7 +8,7 @@ from redkyn.canvas.exceptions import AuthenticationFailed, CourseNotFound
 from assigner import make_help_parser
 from assigner.backends.decorators import requires_config_and_backend
 from assigner.config import requires_config, DuplicateUserError
-from assigner.roster_util import add_to_roster
+from assigner.roster_util import add_to_roster, resolve_user_ids
 
 help = "Get Canvas course information"
 
@@ -67,11 +67,14 @@ def import_from_canvas(conf, backend, args):
 
         try:
             add_to_roster(
-                conf, backend, conf.roster, s['sortable_name'], s[username_column], section, force, s['id']
+                conf, backend, conf.roster, s['sortable_name'], s[username_column], section, force, s['id'],
+                resolve_id=False
             )
         except DuplicateUserError:
             logger.warning("User %s is already in the roster, skipping", s[username_column])
 
+    resolve_user_ids(conf, backend, conf.roster)
+
     print("Imported {} students.".format(len(students)))
 
 
@@ -5,8 +5,9 @@ from git import NoSuchPathError, GitCommandError, InvalidGitRepositoryError
 
 from assigner.backends import RepoError
 from assigner.backends.exceptions import RetryableGitError
-from assigner import progress
+from assigner import parallel, progress
 from assigner.backends.decorators import requires_config_and_backend
+from assigner.ssh import requires_multiplexed_ssh
 from assigner.roster_util import get_filtered_roster
 
 from prettytable import PrettyTable
@@ -16,6 +17,7 @@ help = "Clone or fetch student repos"
 logger = logging.getLogger(__name__)
 
 
+@requires_multiplexed_ssh
 @requires_config_and_backend
 def get(conf, backend, args):
     _get(conf, backend, args)
@@ -46,79 +48,34 @@ def _get(conf, backend, args):
     output.align["Name"] = "l"
     output.align["Change"] = "l"
 
-    for i, student in progress.enumerate(roster):
-        username = student["username"]
-        student_section = student["section"]
-        full_name = backend.student_repo.build_name(semester, student_section,
-                                                    hw_name, username)
-
-        try:
-            repo = backend.student_repo(backend_conf, namespace, full_name)
-            repo_dir = os.path.join(path, username)
-
-            row = str(i + 1)
-            sec = student["section"]
-            sid = student["username"]
-            name = student["name"]
-
-            try:
-                logging.debug("Attempting to use local repo %s...", repo_dir)
-                repo.add_local_copy(repo_dir)
-
-                logging.debug("Local repo exists, fetching...")
-                results = repo.repo.remote().fetch()
-                for result in results:
-                    logging.debug(
-                        "fetch result: name: %s flags: %s note: %s",
-                        result.ref.name,
-                        result.flags,
-                        result.note
-                    )
-
-                    # see:
-                    # http://gitpython.readthedocs.io/en/stable/reference.html#git.remote.FetchInfo
-                    if result.flags & result.NEW_HEAD:
-                        output.add_row([
-                            row, sec, sid, name, "{}: new branch at {}".format(
-                                result.ref.name, str(result.ref.commit)[:8]
-                            )
-                        ])
-                        row = sec = sid = name = "" # don't print user info more than once
-
-                    elif result.old_commit is not None:
-                        output.add_row([
-                            row, sec, sid, name, "{}: {} -> {}".format(
-                                result.ref.name, str(result.old_commit)[:8],
-                                str(result.ref.commit)[:8]
-                            )
-                        ])
-                        row = sec = sid = name = ""
-
-                logging.debug("Pulling specified branches...")
-                for b in branch:
-                    try:
-                        repo.get_head(b).checkout(force=force)
-                        repo.pull(b)
-                    except GitCommandError as e:
-                        logging.debug(e)
-                        logging.warning("Local changes to %s/%s would be overwritten by pull",
-                                        username, b)
-                        logging.warning("  (use --force to overwrite)")
-
-            except (NoSuchPathError, InvalidGitRepositoryError):
-                logging.debug("Local repo does not exist; cloning...")
-                repo.clone_to(repo_dir, branch, attempts)
-                output.add_row([row, sec, sid, name, "Cloned a new copy"])
-
-            # Check out first branch specified; this is probably what people expect
-            # If there's just one branch, it's already checked out by the loop above
-            if len(branch) > 1:
-                repo.get_head(branch[0]).checkout()
-
-        except RetryableGitError as e:
-            logging.warning(e)
-        except RepoError as e:
-            logging.warning(e)
+    def get_student_repo(numbered_student):
+        _, student = numbered_student
+        full_name = backend.student_repo.build_name(semester, student["section"],
+                                                    hw_name, student["username"])
+        repo_dir = os.path.join(path, student["username"])
+        return _get_one(backend, backend_conf, namespace, full_name, repo_dir,
+                        branch, force, attempts)
+
+    # Workers finish in whatever order they like; collect each student's
+    # changes so they can be reported in roster order.
+    changes = {}
+    failures = []
+    results = parallel.imap(get_student_repo, list(enumerate(roster)), args.jobs)
+    for (i, student), student_changes, error in progress.iterate(results, len(roster)):
+        if error is not None:
+            failures.append((student, error))
+            student_changes = []
+        changes[i] = student_changes
+
+    for i, student in enumerate(roster):
+        row = str(i + 1)
+        sec = student["section"]
+        sid = student["username"]
+        name = student["name"]
+
+        for change in changes[i]:
+            output.add_row([row, sec, sid, name, change])
+            row = sec = sid = name = "" # don't print user info more than once
 
     out_str = output.get_string()
     if out_str != "":
@@ -126,6 +83,80 @@ def _get(conf, backend, args):
     else:
         print("No changes since last call to get")
 
+    if failures:
+        logging.error("Failed to get %d repositories:", len(failures))
+        for student, error in failures:
+            logging.error("  %s: %s", student["username"], error)
+            logging.debug("Traceback for %s:", student["username"], exc_info=error)
+
+
+def _get_one(backend, backend_conf, namespace, full_name, repo_dir,
+             branch, force, attempts):
+    """
+    Clones or fetches a single student repository into repo_dir.
+    Returns a list of descriptions of what changed.
+    """
+    changes = []
+
+    try:
+        repo = backend.student_repo(backend_conf, namespace, full_name)
+        username = os.path.basename(repo_dir)
+
+        try:
+            logging.debug("Attempting to use local repo %s...", repo_dir)
+            repo.add_local_copy(repo_dir)
+
+            logging.debug("Local repo exists, fetching...")
+            results = repo.repo.remote().fetch()
+            for result in results:
+                logging.debug(
+                    "fetch result: name: %s flags: %s note: %s",
+                    result.ref.name,
+                    result.flags,
+                    result.note
+                )
+
+                # see:
+                # http://gitpython.readthedocs.io/en/stable/reference.html#git.remote.FetchInfo
+                if result.flags & result.NEW_HEAD:
+                    changes.append("{}: new branch at {}".format(
+                        result.ref.name, str(result.ref.commit)[:8]
+                    ))
+
+                elif result.old_commit is not None:
+                    changes.append("{}: {} -> {}".format(
+                        result.ref.name, str(result.old_commit)[:8],
+                        str(result.ref.commit)[:8]
+                    ))
+
+            logging.debug("Updating specified branches...")
+            for b in branch:
+                try:
+                    repo.get_head(b).checkout(force=force)
+                    repo.merge_fetched(b)
+                except GitCommandError as e:
+                    logging.debug(e)
+                    logging.warning("Local changes to %s/%s would be overwritten by pull",
+                                    username, b)
+                    logging.warning("  (use --force to overwrite)")
+
+        except (NoSuchPathError, InvalidGitRepositoryError):
+            logging.debug("Local repo does not exist; cloning...")
+            repo.clone_to(repo_dir, branch, attempts)
+            changes.append("Cloned a new copy")
+
+        # Check out first branch specified; this is probably what people expect
+        # If there's just one branch, it's already checked out by the loop above
+        if len(branch) > 1:
+            repo.get_head(branch[0]).checkout()
+
+    except RetryableGitError as e:
+        logging.warning(e)
+    except RepoError as e:
+        logging.warning(e)
+
+    return changes
+
 
 def setup_parser(parser):
     parser.add_argument("name",
@@ -142,4 +173,6 @@ def setup_parser(parser):
                         help="ID of student whose assignment needs retrieving.")
     parser.add_argument("--attempts", default=5,
                         help="Number of times to retry failed git commands")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="Number of repositories to clone or fetch concurrently")
     parser.set_defaults(run=get)
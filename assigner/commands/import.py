@@ -4,7 +4,7 @@ import re
 
 from assigner.backends.decorators import requires_config_and_backend
 from assigner.config import DuplicateUserError
-from assigner.roster_util import add_to_roster
+from assigner.roster_util import add_to_roster, resolve_user_ids
 
 help = "Import users from a csv"
 
@@ -31,11 +31,14 @@ def import_students(conf, backend, args):
 
             try:
                 add_to_roster(
-                    conf, backend, conf.roster, row[3], match.group("user"), section, args.force
+                    conf, backend, conf.roster, row[3], match.group("user"), section, args.force,
+                    resolve_id=False
                 )
             except DuplicateUserError:
                 logger.warning("User %s is already in the roster, skipping", match.group("user"))
 
+    resolve_user_ids(conf, backend, conf.roster)
+
     print("Imported {} students.".format(count))
 
 
@@ -38,4 +38,6 @@ def setup_parser(parser):
                         help="ID of student whose assignment needs locking.")
     parser.add_argument("--dry-run", action="store_true",
                         help="Don't actually do it.")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="Number of repositories to change concurrently")
     parser.set_defaults(run=lock)
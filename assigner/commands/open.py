@@ -6,7 +6,7 @@ from assigner.backends.exceptions import (
     UserInAssignerGroup,
     UserAlreadyAssigned,
 )
-from assigner.roster_util import get_filtered_roster
+from assigner.roster_util import build_student_repos, get_filtered_roster
 from assigner import progress
 
 help = "Grants students access to their repos"
@@ -29,21 +29,17 @@ def open_all_assignments(conf, backend, args):
     repositories as Developers so they can pull/commit/push their work.
     """
     hw_name = args.name
-    namespace = conf.namespace
-    semester = conf.semester
     backend_conf = conf.backend
 
     roster = get_filtered_roster(conf.roster, args.section, args.student)
 
+    repos = build_student_repos(conf, backend, hw_name, roster)
+
     count = 0
-    for student in progress.iterate(roster):
+    for student, repo in progress.iterate(list(zip(roster, repos))):
         username = student["username"]
-        student_section = student["section"]
-        full_name = backend.student_repo.build_name(semester, student_section,
-                                                    hw_name, username)
 
         try:
-            repo = backend.student_repo(backend_conf, namespace, full_name)
             if "id" not in student:
                 student["id"] = backend.repo.get_user_id(username, backend_conf)
 
@@ -52,7 +48,7 @@ def open_all_assignments(conf, backend, args):
         except UserInAssignerGroup:
             logging.info("%s already has access via group membership, skipping...", username)
         except RepoError:
-            logging.warning("Could not add %s to %s.", username, full_name)
+            logging.warning("Could not add %s to %s.", username, repo.name)
 
     print("Granted access to {} repositories.".format(count))
 
@@ -9,10 +9,15 @@ logger = logging.getLogger(__name__)
 
 def protect(args):
     """Protect a branch in each student's repository so they cannot force push to it."""
-    for branch in args.branch:
-        logging.info("Protecting %s...", branch)
-        #pylint: disable=no-value-for-parameter, cell-var-from-loop
-        manage_repos(args, lambda repo, _: repo.protect(branch))
+    logging.info("Protecting %s...", ", ".join(args.branch))
+
+    def _protect(repo, _):
+        for branch in args.branch:
+            repo.protect(branch)
+        return True
+
+    #pylint: disable=no-value-for-parameter
+    manage_repos(args, _protect, requests=len(args.branch))
 
 def setup_parser(parser):
     parser.add_argument("name",
@@ -25,4 +30,6 @@ def setup_parser(parser):
                         help="ID of student whose assignment to protect.")
     parser.add_argument("--dry-run", action="store_true",
                         help="Don't actually do it.")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="Number of repositories to change concurrently")
     parser.set_defaults(run=protect)
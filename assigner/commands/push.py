@@ -3,9 +3,10 @@ import os
 
 from git.exc import NoSuchPathError
 
-from assigner.roster_util import get_filtered_roster
+from assigner.roster_util import build_student_repos, get_filtered_roster
 from assigner.backends import RepoError
 from assigner.backends.decorators import requires_config_and_backend
+from assigner.ssh import requires_multiplexed_ssh
 from assigner import progress
 
 help = "Push changes to student repos"
@@ -13,6 +14,7 @@ help = "Push changes to student repos"
 logger = logging.getLogger(__name__)
 
 
+@requires_multiplexed_ssh
 @requires_config_and_backend
 def push(conf, backend, args):
     _push(conf, backend, args)
@@ -20,9 +22,6 @@ def push(conf, backend, args):
 def _push(conf, backend, args):
     hw_name = args.name
     hw_path = args.path
-    namespace = conf.namespace
-    semester = conf.semester
-    backend_conf = conf.backend
     branch = args.branch
     force = args.force
     push_unlocked = args.push_unlocked
@@ -31,14 +30,13 @@ def _push(conf, backend, args):
 
     roster = get_filtered_roster(conf.roster, args.section, args.student)
 
-    for student in progress.iterate(roster):
+    repos = build_student_repos(conf, backend, hw_name, roster)
+
+    for student, repo in progress.iterate(list(zip(roster, repos))):
         username = student["username"]
-        student_section = student["section"]
-        full_name = backend.student_repo.build_name(semester, student_section,
-                                                    hw_name, username)
+        full_name = repo.name
 
         try:
-            repo = backend.student_repo(backend_conf, namespace, full_name)
             repo_dir = os.path.join(path, username)
             repo.add_local_copy(repo_dir)
 
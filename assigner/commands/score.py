@@ -1,19 +1,27 @@
+import functools
 import logging
 import argparse
 from typing import Any, Dict, List, Optional, Tuple, Set
 import re
 import os
 
-from redkyn.canvas import CanvasAPI
+import git
+
 from redkyn.canvas.exceptions import CourseNotFound, StudentNotFound
 
 from assigner import make_help_parser
 from assigner.backends.base import RepoError, RepoBase, BackendBase
 from assigner.backends.decorators import requires_config_and_backend
 from assigner.backends.exceptions import CIArtifactNotFound
+from assigner.cache import get_cache, mirror_path, CHECKPOINT_TTL
+from assigner.canvas_util import CanvasAPI
 from assigner.exceptions import AssignerException
-from assigner.roster_util import get_filtered_roster
-from assigner import progress
+from assigner.roster_util import (
+    build_student_repos,
+    get_filtered_roster,
+    resolve_user_ids,
+)
+from assigner import parallel, progress
 from assigner.config import Config
 
 help = "Retrieves scores from CI artifacts and optionally uploads to Canvas"
@@ -21,7 +29,7 @@ help = "Retrieves scores from CI artifacts and optionally uploads to Canvas"
 logger = logging.getLogger(__name__)
 
 class CIJobNotFound(AssignerException):
-    """ No CI jobs found for repository. """
+    """ No successful CI jobs found for repository. """
 
 class OptionalCanvas:
     """
@@ -103,20 +111,28 @@ class OptionalCanvas:
         return cls._assignment_ids
 
 
-def get_most_recent_score(repo: RepoBase, result_path: str) -> float:
+def get_most_recent_score(
+    repo: RepoBase, result_path: str, job_name: Optional[str] = None, ref: str = "master"
+) -> float:
     """
-    Queries the most recent CI job for an artifact containing the score
+    Queries the most recent successful CI job for an artifact containing the score
     :param repo: the repository whose CI jobs should be checked
     :param result_path: the absolute path to the artifact file within the repo
+    :param job_name: the name of the grading job; if given, the artifact is
+    fetched from its latest successful run on ref in a single request
+    :param ref: the branch the grading job runs on
     :return: the score in the artifact file
     """
     try:
-        ci_jobs = repo.list_ci_jobs()
-        if len(ci_jobs) == 0:
-            raise CIJobNotFound
-
-        most_recent_job_id = ci_jobs[0]["id"]
-        score_file = repo.get_ci_artifact(most_recent_job_id, result_path)
+        if job_name:
+            score_file = repo.get_latest_ci_artifact(ref, job_name, result_path)
+        else:
+            most_recent_job = next(iter(repo.list_ci_jobs("success", per_page=1)), None)
+            if most_recent_job is None:
+                raise CIJobNotFound
+
+            most_recent_job_id = most_recent_job["id"]
+            score_file = repo.get_ci_artifact(most_recent_job_id, result_path)
         last_token = score_file.split()[-1]
         score = float(last_token)
         if not 0.0 <= score <= 100.0:
@@ -178,8 +194,29 @@ def verify_commit(auth_emails: List[str], repo: RepoBase, commit_hash: str) -> b
     return email in auth_emails
 
 
+def list_template_commits(
+    conf: Config, backend: BackendBase, hw_name: str
+) -> Set[str]:
+    """
+    Lists the commits in an assignment's template, which every student
+    repo starts out with
+    :param hw_name: the name of the homework assignment
+    :return: the full SHAs of the template's commits
+    """
+    template = backend.template_repo(conf.backend, conf.namespace, hw_name)
+    try:
+        return set(template.list_commit_hashes("master"))
+    except RepoError as e:
+        logger.debug(e)
+        logger.warning("Unable to find template repo %s; checking every commit", hw_name)
+        return set()
+
+
 def check_repo_integrity(
-    repo: RepoBase, files_to_check: Set[str], since: str = ""
+    repo: RepoBase,
+    files_to_check: Set[str],
+    since: str = "",
+    template_commits: Set[str] = frozenset(),
 ) -> None:
     """
     Checks whether any "protected" files in a repository have been modified
@@ -187,13 +224,143 @@ def check_repo_integrity(
     :param repo: the repository object to check
     :param files_to_check: the absolute paths (within the repo) of protected files
     :param since: the date after which to check, i.e., commits prior to this date are ignored
+    :param template_commits: commits from the assignment's template, which are not checked
+
+    Each repo's last checked commit and its violations are kept in the
+    cache, so later checks only look at commits pushed since.
     """
-    auth_emails = repo.list_authorized_emails()
-    commits = repo.list_commit_hashes("master", since)
-    for commit in commits:
-        modified_files = files_to_check.intersection(repo.list_commit_files(commit))
-        if modified_files and not verify_commit(auth_emails, repo, commit):
-            logger.warning("commit %s modified files: %s", commit, str(modified_files))
+    head = next(iter(repo.list_commits("master", per_page=1)), None)
+    if head is None:
+        return
+    head = head["id"]
+
+    # Pick up where the last check of this repo left off, unless its
+    # history has been rewritten since
+    checkpoint_key = "/integrity?since={}&files={}".format(since, ",".join(sorted(files_to_check)))
+    checkpoint = get_cache().get(repo.url, checkpoint_key)
+    base = None
+    violations = []  # type: List[List[Any]]
+    if checkpoint is not None:
+        if checkpoint["commit"] == head or repo.is_ancestor(checkpoint["commit"], head):
+            base = checkpoint["commit"]
+            violations = checkpoint["violations"]
+        else:
+            logger.info("History of %s was rewritten; checking all of it again.", repo.name)
+
+    # Otherwise start from the last commit before `since` (or the last
+    # template commit)
+    if base is None and since:
+        base = next(iter(repo.list_commits("master", until=since, per_page=1)), {}).get("id")
+    elif base is None and template_commits:
+        base = next(
+            (c["id"] for c in repo.list_commits("master") if c["id"] in template_commits),
+            None,
+        )
+
+    if base == head:
+        commits = []
+    elif base is not None:
+        # Most repos haven't touched the protected files at all, which one
+        # comparison can tell us
+        commits, changed = repo.compare(base, head)
+        if not files_to_check.intersection(changed):
+            logger.debug("No protected files changed in %s.", repo.name)
+            commits = []
+    else:
+        commits = repo.list_commit_hashes("master", since)
+
+    commits = [commit for commit in commits if commit not in template_commits]
+    if commits:
+        auth_emails = repo.list_authorized_emails()
+        for commit in commits:
+            modified_files = files_to_check.intersection(repo.list_commit_files(commit))
+            if modified_files and not verify_commit(auth_emails, repo, commit):
+                violations.append([commit, sorted(modified_files)])
+
+    for commit, modified_files in violations:
+        logger.warning("commit %s modified files: %s", commit, str(set(modified_files)))
+
+    get_cache().set(
+        repo.url, checkpoint_key, {"commit": head, "violations": violations}, CHECKPOINT_TTL
+    )
+
+
+def list_local_template_commits(conf: Config, hw_name: str) -> Set[str]:
+    """
+    Lists the commits in the local mirror of an assignment's template (kept
+    by `assign`), without contacting the backend
+    :param hw_name: the name of the homework assignment
+    :return: the full SHAs of the template's commits
+    """
+    mirror = mirror_path(conf.backend.get("host", ""), conf.namespace, hw_name)
+    if mirror and os.path.isdir(mirror):
+        return set(git.Repo(mirror).git.rev_list("--branches").split())
+
+    logger.warning("No local copy of the %s template; checking every commit", hw_name)
+    return set()
+
+
+def verify_local_signature(status: str, signer: str, signers: Optional[List[str]]) -> bool:
+    """
+    Checks whether git verified a commit's signature locally
+    :param status: git's signature status (%G?) for the commit
+    :param signer: the signer (%GS) of the commit, e.g. "Name <email>"
+    :param signers: the emails authorized to sign commits; if empty, no
+    signature is trusted
+    :return: whether the commit was signed by an authorized user
+    """
+    # G is a good signature, U a good signature from a key we haven't certified
+    if status not in ("G", "U") or not signers:
+        return False
+    match = re.search(r"<([^>]+)>", signer)
+    return (match.group(1) if match else signer) in signers
+
+
+@functools.lru_cache(maxsize=None)
+def merge_diff_args() -> List[str]:
+    """
+    git log arguments that diff merges against their first parent, as the
+    API does, so changes made while resolving them aren't missed
+    """
+    if git.Git().version_info >= (2, 31):
+        return ["--diff-merges=first-parent"]
+    # Older git can only do this by following first parents alone. Changes
+    # from merged branches are then attributed to the merges themselves.
+    logger.debug("git is older than 2.31; only checking first parents.")
+    return ["-m", "--first-parent"]
+
+
+def check_local_integrity(
+    repo_dir: str,
+    files_to_check: Set[str],
+    signers: Optional[List[str]] = None,
+    template_commits: Set[str] = frozenset(),
+) -> List[Tuple[str, Set[str]]]:
+    """
+    Checks whether any "protected" files in a local clone have been modified
+    by an unauthorized user, using only the local git object database
+    :param repo_dir: the clone to check, e.g. one made by `assigner get`
+    :param files_to_check: the absolute paths (within the repo) of protected files
+    :param signers: the emails authorized to modify protected files
+    :param template_commits: commits from the assignment's template, which are not checked
+    :return: the unauthorized commits and the protected files they modified
+    """
+    # One pass over the history gives every commit's files and signature
+    log = git.Repo(repo_dir).git.log(
+        "master", "--name-only", *merge_diff_args(), "--format=%x1e%H%x1f%G?%x1f%GS"
+    )
+
+    violations = []
+    for entry in log.split("\x1e")[1:]:
+        header, *paths = entry.split("\n")
+        commit, status, signer = header.split("\x1f")
+        if commit in template_commits:
+            continue
+
+        modified_files = files_to_check.intersection(paths)
+        if modified_files and not verify_local_signature(status, signer, signers):
+            violations.append((commit, modified_files))
+    return violations
 
 
 def print_statistics(scores: List[float]) -> None:
@@ -249,68 +416,194 @@ def print_histogram(scores: List[float]) -> None:
         )
 
 
-def handle_scoring(
+def fetch_score(
     conf: Config,
     backend: BackendBase,
     args: argparse.Namespace,
     student: Dict[str, Any],
+    repo: Optional[RepoBase] = None,
+    template_commits: Set[str] = frozenset(),
 ) -> Optional[float]:
     """
     Obtains the autograded score from a repository's CI jobs
     :param student: The part of the config structure with info
     on a student's username, ID, and section
+    :param repo: the student's repository, if it has already been looked up
+    :param template_commits: commits from the assignment's template, which
+    are skipped when checking integrity
     :return: The score obtained from the results file
     """
     hw_name = args.name
-    upload = args.upload if "upload" in args else True
     files_to_check = set(args.files)
     backend_conf = conf.backend
     username = student["username"]
-    student_section = student["section"]
     full_name = backend.student_repo.build_name(
-        conf.semester, student_section, hw_name, username
+        conf.semester, student["section"], hw_name, username
     )
     try:
-        repo = backend.student_repo(backend_conf, conf.namespace, full_name)
+        if repo is None:
+            repo = backend.student_repo(backend_conf, conf.namespace, full_name)
         logger.info("Scoring %s...", repo.name_with_namespace)
         if "id" not in student:
             student["id"] = backend.repo.get_user_id(username, backend_conf)
         if not args.noverify:
             unlock_time = repo.get_member_add_date(student["id"])
-            check_repo_integrity(repo, files_to_check, unlock_time)
-        score = get_most_recent_score(repo, args.path)
-        if upload:
-            canvas = OptionalCanvas.get_api(conf)
-            section_ids = OptionalCanvas.get_section_ids(conf, hw_name)
-            assignment_ids = OptionalCanvas.get_assigment_ids(conf, hw_name)
-            course_id = section_ids[student_section]
-            assignment_id = assignment_ids[student_section]
-            try:
-                if "canvas-id" not in student:
-                    raise StudentNotFound(
-                        "No Canvas ID for student.  Remove the student with `assigner roster remove {}`,"
-                        " then run 'assigner canvas import {} {}`.".format(
-                            username, course_id, student_section
-                        )
-                    )
-                # Append a percent as provided scores are percentages and not number of pts
-                canvas.put_assignment_submission(
-                    course_id, assignment_id, student["canvas-id"], str(score) + "%",
-                )
-            except StudentNotFound as e:
-                logger.debug(e)
-                logger.warning("Unable to update submission for Canvas assignment")
-
+            check_repo_integrity(repo, files_to_check, unlock_time, template_commits)
+        return get_most_recent_score(repo, args.path, args.job, args.ref)
     except CIJobNotFound:
-        logger.error("No CI jobs found for repo %s", repo.name_with_namespace)
-        score = None
+        logger.error("No successful CI jobs found for repo %s", repo.name_with_namespace)
     except RepoError as e:
         logger.debug(e)
         logger.warning("Unable to find repo for %s with URL %s", username, full_name)
-        score = None
+    return None
+
+
+def upload_score(
+    conf: Config, args: argparse.Namespace, student: Dict[str, Any], score: float
+) -> None:
+    """
+    Uploads a student's score to their section's Canvas assignment
+    :param student: The part of the config structure with info
+    on a student's username, Canvas ID, and section
+    :param score: the score to upload, as a percentage
+    """
+    hw_name = args.name
+    username = student["username"]
+    student_section = student["section"]
+
+    canvas = OptionalCanvas.get_api(conf)
+    section_ids = OptionalCanvas.get_section_ids(conf, hw_name)
+    assignment_ids = OptionalCanvas.get_assigment_ids(conf, hw_name)
+    course_id = section_ids[student_section]
+    assignment_id = assignment_ids[student_section]
+    try:
+        if "canvas-id" not in student:
+            raise StudentNotFound(
+                "No Canvas ID for student.  Remove the student with `assigner roster remove {}`,"
+                " then run 'assigner canvas import {} {}`.".format(
+                    username, course_id, student_section
+                )
+            )
+        # Append a percent as provided scores are percentages and not number of pts
+        canvas.put_assignment_submission(
+            course_id, assignment_id, student["canvas-id"], str(score) + "%",
+        )
+    except StudentNotFound as e:
+        logger.debug(e)
+        logger.warning("Unable to update submission for Canvas assignment")
+
+
+def handle_scoring(
+    conf: Config,
+    backend: BackendBase,
+    args: argparse.Namespace,
+    student: Dict[str, Any],
+    repo: Optional[RepoBase] = None,
+    template_commits: Set[str] = frozenset(),
+) -> Optional[float]:
+    """
+    Obtains the autograded score from a repository's CI jobs and uploads
+    it to Canvas if asked to
+    :param student: The part of the config structure with info
+    on a student's username, ID, and section
+    :param repo: the student's repository, if it has already been looked up
+    :param template_commits: commits from the assignment's template, which
+    are skipped when checking integrity
+    :return: The score obtained from the results file
+    """
+    upload = args.upload if "upload" in args else True
+    score = fetch_score(conf, backend, args, student, repo, template_commits)
+    if upload and score is not None:
+        upload_score(conf, args, student, score)
     return score
 
 
+def upload_scores(
+    conf: Config, args: argparse.Namespace, scored: List[Tuple[Dict[str, Any], float]]
+) -> None:
+    """
+    Uploads the scores that differ from the grades already in Canvas, with
+    one bulk grade update per section
+    :param scored: pairs of students and their scores, as percentages
+    """
+    hw_name = args.name
+    canvas = OptionalCanvas.get_api(conf)
+    section_ids = OptionalCanvas.get_section_ids(conf, hw_name)
+    assignment_ids = OptionalCanvas.get_assigment_ids(conf, hw_name)
+
+    scores = {}  # type: Dict[str, Dict[str, float]]
+    skipped = 0
+    for student, score in scored:
+        if "canvas-id" not in student:
+            logger.warning(
+                "No Canvas ID for %s.  Remove the student with `assigner roster remove %s`,"
+                " then run `assigner canvas import`.",
+                student["username"],
+                student["username"],
+            )
+            skipped += 1
+            continue
+        scores.setdefault(student["section"], {})[str(student["canvas-id"])] = score
+
+    def upload_section(section):
+        course_id = section_ids[section]
+        assignment_id = assignment_ids[section]
+        points = canvas.get_assignment(course_id, assignment_id).get("points_possible")
+        current = {
+            str(submission["user_id"]): entered_score(submission)
+            for submission in canvas.get_assignment_submissions(course_id, assignment_id)
+        }
+
+        # Append a percent as provided scores are percentages and not number of pts
+        changed = {
+            canvas_id: str(score) + "%"
+            for canvas_id, score in scores[section].items()
+            if not same_grade(current.get(canvas_id), score, points)
+        }
+        if changed:
+            job = canvas.update_grades(course_id, assignment_id, changed)
+            canvas.wait_for_progress(job)
+        return len(changed)
+
+    changed = unchanged = 0
+    results = parallel.imap(upload_section, sorted(scores), args.canvas_jobs)
+    for section, count, error in results:
+        if error is not None:
+            logger.error("Failed to upload grades for section %s: %s", section, error)
+            logger.debug("Traceback for section %s:", section, exc_info=error)
+            skipped += len(scores[section])
+        else:
+            changed += count
+            unchanged += len(scores[section]) - count
+
+    print("Uploaded {} changed grades ({} unchanged, {} skipped).".format(
+        changed, unchanged, skipped
+    ))
+
+
+def entered_score(submission: Dict[str, Any]) -> Optional[float]:
+    """
+    The points that were uploaded for a submission, before Canvas applied
+    any late or missing policy deductions (which "score" includes)
+    """
+    if "entered_score" in submission:
+        return submission["entered_score"]
+    return submission.get("score")
+
+
+def same_grade(current: Optional[float], score: float, points: Optional[float]) -> bool:
+    """
+    Whether a grade already in Canvas matches a score
+    :param current: the points entered for the submission in Canvas, if graded
+    :param score: the score, as a percentage
+    :param points: the points the assignment is worth
+    """
+    if current is None or not points:
+        return False
+    # Canvas keeps scores to two decimal places
+    return abs(current - score / 100 * points) < 0.005
+
+
 @requires_config_and_backend
 def score_assignments(
     conf: Config, backend: BackendBase, args: argparse.Namespace
@@ -322,15 +615,42 @@ def score_assignments(
 
     roster = get_filtered_roster(conf.roster, args.section, student)
 
-    scores = []
-    for student in progress.iterate(roster):
-        score = handle_scoring(conf, backend, args, student)
-        if score is not None:
-            scores.append(score)
-
+    repos = build_student_repos(conf, backend, args.name, roster)
+    resolve_user_ids(conf, backend, roster)
+    if args.upload:
+        # Look up the Canvas IDs first, so missing configuration is caught
+        # before scoring everyone
+        OptionalCanvas.get_assigment_ids(conf, args.name)
+    template_commits = set()
+    if not args.noverify:
+        template_commits = list_template_commits(conf, backend, args.name)
+
+    def score_one(student_repo):
+        student, repo = student_repo
+        return fetch_score(conf, backend, args, student, repo, template_commits)
+
+    scored = []
+    failures = []
+    results = parallel.imap(score_one, list(zip(roster, repos)), args.jobs)
+    for (student, _), score, error in progress.iterate(results, len(roster)):
+        if error is not None:
+            failures.append((student, error))
+        elif score is not None:
+            scored.append((student, score))
+
+    scores = [score for _, score in scored]
     print("Scored {} repositories.".format(len(scores)))
     print_statistics(scores)
 
+    if failures:
+        logger.error("Failed to score %d repositories:", len(failures))
+        for student, error in failures:
+            logger.error("  %s: %s", student["username"], error)
+            logger.debug("Traceback for %s:", student["username"], exc_info=error)
+
+    if args.upload:
+        upload_scores(conf, args, scored)
+
 
 @requires_config_and_backend
 def checkout_students(
@@ -340,6 +660,9 @@ def checkout_students(
     artifact, which contains their autograded score
     """
     roster = get_filtered_roster(conf.roster, args.section, None)
+    template_commits = set()
+    if not args.noverify:
+        template_commits = list_template_commits(conf, backend, args.name)
 
     while True:
         query = input("Enter student ID or name, or 'q' to quit: ")
@@ -349,7 +672,7 @@ def checkout_students(
         if not student:
             continue
 
-        score = handle_scoring(conf, backend, args, student)
+        score = handle_scoring(conf, backend, args, student, None, template_commits)
         logger.info("Uploaded score of %d", (score))
 
 
@@ -364,21 +687,62 @@ def integrity_check(
     files_to_check = set(args.files)
     roster = get_filtered_roster(conf.roster, args.section, None)
 
-    for student in progress.iterate(roster):
-        username = student["username"]
-        student_section = student["section"]
-        full_name = backend.student_repo.build_name(
-            conf.semester, student_section, args.name, username
+    if args.local:
+        local_integrity_check(conf, args, roster)
+        return
+
+    repos = build_student_repos(conf, backend, args.name, roster)
+    template_commits = list_template_commits(conf, backend, args.name)
+
+    def check(student_repo):
+        _, repo = student_repo
+        check_repo_integrity(repo, files_to_check, "", template_commits)
+
+    results = parallel.imap(check, list(zip(roster, repos)), args.jobs)
+    for (student, repo), _, error in progress.iterate(results, len(roster)):
+        if isinstance(error, RepoError):
+            logger.debug(error)
+            logger.warning(
+                "Unable to find repo for %s with URL %s", student["username"], repo.name
+            )
+        elif error is not None:
+            raise error
+
+
+def local_integrity_check(
+    conf: Config, args: argparse.Namespace, roster: List[Dict[str, Any]]
+) -> None:
+    """
+    Checks the integrity of the students' repositories cloned under
+    args.local by `assigner get`, without contacting the backend
+    """
+    files_to_check = set(args.files)
+    path = os.path.join(args.local, args.name)
+    template_commits = list_local_template_commits(conf, args.name)
+    if not args.signers:
+        logger.warning(
+            "No --signers given; every change to a protected file will be reported"
         )
 
-        try:
-            repo = backend.student_repo(conf.backend, conf.namespace, full_name)
-            check_repo_integrity(repo, files_to_check)
-        except RepoError as e:
-            logger.debug(e)
+    def check(student):
+        repo_dir = os.path.join(path, student["username"])
+        return check_local_integrity(repo_dir, files_to_check, args.signers, template_commits)
+
+    # Check in parallel, but report in roster order
+    violations = {}
+    results = parallel.imap(check, roster, args.jobs)
+    for student, found, error in progress.iterate(results, len(roster)):
+        if error is not None:
+            logger.debug(error)
             logger.warning(
-                "Unable to find repo for %s with URL %s", username, full_name
+                "Unable to check local repo for %s in %s", student["username"], path
             )
+        else:
+            violations[student["username"]] = found
+
+    for student in roster:
+        for commit, modified_files in violations.get(student["username"], []):
+            logger.warning("commit %s modified files: %s", commit, str(modified_files))
 
 
 def setup_parser(parser: argparse.ArgumentParser):
@@ -393,6 +757,19 @@ def setup_parser(parser: argparse.ArgumentParser):
     all_parser.add_argument(
         "--upload", action="store_true", help="Upload grades to Canvas"
     )
+    all_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of repositories to score concurrently",
+    )
+    all_parser.add_argument(
+        "--canvas-jobs",
+        type=int,
+        default=1,
+        help="Number of sections to upload grades for concurrently",
+    )
 
     all_parser.set_defaults(run=score_assignments)
 
@@ -407,6 +784,25 @@ def setup_parser(parser: argparse.ArgumentParser):
         help="Check the integrity of desired files for a set of assignment respositories",
     )
     integrity_parser.add_argument("--student", nargs=1, help="ID of student to score")
+    integrity_parser.add_argument(
+        "--local",
+        metavar="PATH",
+        help="Check the repos `assigner get` cloned under PATH using only local git",
+    )
+    integrity_parser.add_argument(
+        "--signers",
+        nargs="+",
+        metavar="EMAIL",
+        help="With --local, emails allowed to sign changes to protected files "
+        "(default: nobody)",
+    )
+    integrity_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of repositories to check concurrently",
+    )
     integrity_parser.set_defaults(run=integrity_check)
 
     # Flags common to all subcommands
@@ -434,5 +830,15 @@ def setup_parser(parser: argparse.ArgumentParser):
             default="results.txt",
             help="Path within repo to grader results file",
         )
+        subcmd_parser.add_argument(
+            "--job",
+            help="Name of the CI job that produces the results file; "
+            "fetches its artifact in a single request",
+        )
+        subcmd_parser.add_argument(
+            "--ref",
+            default="master",
+            help="Branch the CI job runs on (used with --job)",
+        )
 
     make_help_parser(parser, subparsers, "Show help for score or one of its commands")
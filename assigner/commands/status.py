@@ -6,7 +6,7 @@ from prettytable import PrettyTable
 from assigner import progress
 from assigner.backends.base import RepoError
 from assigner.backends.decorators import requires_config_and_backend
-from assigner.roster_util import get_filtered_roster
+from assigner.roster_util import build_student_repos, get_filtered_roster
 
 help = "Retrieve status of repos"
 
@@ -21,8 +21,6 @@ def status(conf, backend, args):
     if not hw_name:
         raise ValueError("Missing assignment name.")
 
-    namespace = conf.namespace
-    semester = conf.semester
     backend_conf = conf.backend
 
     roster = get_filtered_roster(conf.roster, args.section, args.student)
@@ -47,19 +45,16 @@ def status(conf, backend, args):
     output.align["Name"] = "l"
     output.align["Last Commit Author"] = "l"
 
-    for i, student in progress.enumerate(roster):
+    repos = build_student_repos(conf, backend, hw_name, roster, refresh=True)
+
+    for i, (student, repo) in progress.enumerate(list(zip(roster, repos))):
 
         name = student["name"]
         username = student["username"]
         student_section = student["section"]
-        full_name = backend.student_repo.build_name(
-            semester, student_section, hw_name, username
-        )
 
         row = [i + 1, student_section, username, name, "", "", "", "", ""]
 
-        repo = backend.student_repo(backend_conf, namespace, full_name)
-
         if not repo.already_exists():
             row[4] = "Not Assigned"
             output.add_row(row)
@@ -73,7 +68,7 @@ def status(conf, backend, args):
                 output.add_row(row)
                 continue
 
-        members = repo.list_members()
+        members = list(repo.list_members())
         if student["id"] not in [s["id"] for s in members]:
             row[4] = "Not Opened"
             output.add_row(row)
@@ -86,7 +81,7 @@ def status(conf, backend, args):
             )
             row[4] = "Open" if level is backend.access.developer else "Locked"
 
-        branches = repo.list_branches()
+        branches = list(repo.list_branches())
 
         if branches:
             row[5] = "\n".join([b["name"] for b in branches])
@@ -11,9 +11,9 @@ class DuplicateUserError(Exception):
 
 
 def requires_config(func):
-    def wrapper(cmdargs, *args):
+    def wrapper(cmdargs, *args, **kwargs):
         with Config(cmdargs.config) as conf:
-            return func(conf, cmdargs, *args)
+            return func(conf, cmdargs, *args, **kwargs)
     return wrapper
 
 
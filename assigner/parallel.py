@@ -0,0 +1,77 @@
+import queue
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+def imap(func, items, jobs=1):
+    """
+    Calls func on each item using up to jobs worker threads, yielding
+    (item, result, exception) tuples as each call finishes.
+
+    Exceptions raised by func are handed back rather than raised so that one
+    failure doesn't abandon the rest of the batch. With a single job, items
+    are processed in order on the calling thread.
+    """
+    if jobs <= 1:
+        for item in items:
+            try:
+                yield item, func(item), None
+            # pylint: disable=broad-except
+            except Exception as e:
+                yield item, None, e
+        return
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(func, item): item for item in items}
+        for future in as_completed(futures):
+            error = future.exception()
+            result = future.result() if error is None else None
+            yield futures[future], result, error
+
+
+class Pipeline:
+    """
+    Runs items through a sequence of stages, each with its own pool of
+    worker threads, so that different items can be in different stages at
+    the same time. Each stage is a (func, jobs) pair; func is called with
+    the item and the value returned by the previous stage (None for the
+    first stage).
+    """
+
+    def __init__(self, *stages):
+        self.stages = stages
+
+    def imap(self, items):
+        """
+        Yields (item, result, exception) tuples as items make it through
+        the last stage (or fail in any stage, which skips the rest).
+        """
+        items = list(items)
+        finished = queue.Queue()
+        executors = [
+            ThreadPoolExecutor(max_workers=max(1, jobs)) for _, jobs in self.stages
+        ]
+
+        def submit(index, item, value):
+            func = self.stages[index][0]
+            future = executors[index].submit(func, item, value)
+            future.add_done_callback(lambda f: advance(index, item, f))
+
+        def advance(index, item, future):
+            error = future.exception()
+            if error is not None:
+                finished.put((item, None, error))
+            elif index + 1 == len(self.stages):
+                finished.put((item, future.result(), None))
+            else:
+                submit(index + 1, item, future.result())
+
+        try:
+            for item in items:
+                submit(0, item, None)
+            for _ in items:
+                yield finished.get()
+        finally:
+            # Earlier stages feed later ones, so shut them down in order
+            for executor in executors:
+                executor.shutdown()
@@ -0,0 +1,75 @@
+import logging
+import math
+
+from collections import Counter
+
+from assigner.cache import latency
+
+logger = logging.getLogger(__name__)
+
+# Rough times (in seconds) for operations we haven't timed against a host yet
+DEFAULT_LATENCIES = {
+    "request": 0.5,
+    "push": 3.0,
+}
+
+
+class Plan:
+    """
+    Tallies what a command would do without doing any of it, along with
+    the API requests and git pushes that would take, and estimates how long
+    it would run from the latencies recorded on previous runs.
+    """
+
+    def __init__(self, host: str):
+        self.host = host
+        self.actions = Counter()  # type: Counter
+        self.requests = 0
+        self.pushes = 0
+
+    def add(self, action: str, requests: int = 0, pushes: int = 0) -> None:
+        """Count one repo getting action, costing requests and pushes"""
+        self.actions[action] += 1
+        self.requests += requests
+        self.pushes += pushes
+
+    def add_requests(self, requests: int) -> None:
+        """Count requests that aren't tied to any one repo"""
+        self.requests += requests
+
+    def _latency(self, kind: str) -> float:
+        recorded = latency(self.host, kind)
+        if recorded is None:
+            logger.debug("No %s latency recorded for %s yet.", kind, self.host)
+            return DEFAULT_LATENCIES[kind]
+        return recorded
+
+    def estimate(self, jobs: int = 1, push_jobs: int = 1) -> float:
+        """Estimated seconds to carry out the plan"""
+        requests = self.requests * self._latency("request") / max(1, jobs)
+        pushes = self.pushes * self._latency("push") / max(1, push_jobs)
+        return requests + pushes
+
+    def report(self, jobs: int = 1, push_jobs: int = 1) -> None:
+        for action, count in sorted(self.actions.items()):
+            print("  {}: {}".format(action, count))
+        print("About {} API request{} and {} push{}, taking roughly {}.".format(
+            self.requests, "s" if self.requests != 1 else "",
+            self.pushes, "es" if self.pushes != 1 else "",
+            format_duration(self.estimate(jobs, push_jobs)),
+        ))
+
+
+def pages(count: int, per_page: int = 100) -> int:
+    """Number of requests to list count items"""
+    return max(1, math.ceil(count / per_page))
+
+
+def format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return "{}h {}m".format(hours, minutes)
+    if minutes:
+        return "{}m {}s".format(minutes, seconds)
+    return "{}s".format(seconds)
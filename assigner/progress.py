@@ -3,18 +3,19 @@ import enlighten
 # prevent name shadowing
 __enumerate = enumerate
 
-def iterate(iterable):
-    return Progress(iterable)
+def iterate(iterable, total=None):
+    return Progress(iterable, total)
 
-def enumerate(iterable):
-    return __enumerate(iterate(iterable))
+def enumerate(iterable, total=None):
+    return __enumerate(iterate(iterable, total))
 
 class Progress:
-    def __init__(self, iterable):
-        try:
-            total = len(iterable)
-        except (TypeError, AttributeError):
-            total = None
+    def __init__(self, iterable, total=None):
+        if total is None:
+            try:
+                total = len(iterable)
+            except (TypeError, AttributeError):
+                total = None
 
         self.iterable = iterable
         self.manager = enlighten.get_manager()
@@ -17,8 +17,12 @@ def get_filtered_roster(roster, section, target):
 
 
 def add_to_roster(
-    conf, backend, roster, name, username, section, force=False, canvas_id=None
+    conf, backend, roster, name, username, section, force=False, canvas_id=None,
+    resolve_id=True
 ):
+    """Adds a student to the roster. When importing many students, pass
+    resolve_id=False and call resolve_user_ids once afterwards instead.
+    """
     student = {
         "name": name,
         "username": username,
@@ -30,12 +34,52 @@ def add_to_roster(
     if not force and any(filter(lambda s: s["username"] == username, roster)):
         raise DuplicateUserError("Student already exists in roster!")
 
-    try:
-        student["id"] = backend.repo.get_user_id(username, conf.backend)
-    except RepoError:
-        logger.warning("Student %s does not have a Gitlab account.", name)
+    if resolve_id:
+        try:
+            student["id"] = backend.repo.get_user_id(username, conf.backend)
+        except RepoError:
+            logger.warning("Student %s does not have a Gitlab account.", name)
 
     if canvas_id:
         student["canvas-id"] = canvas_id
 
     roster.append(student)
+
+
+def resolve_user_ids(conf, backend, roster):
+    """Looks up the backend ids of every student in the roster that is
+    missing one, all at once, and records them in the roster.
+    """
+    missing = [s for s in roster if "id" not in s]
+    if not missing:
+        return
+
+    user_ids = backend.repo.get_user_ids([s["username"] for s in missing], conf.backend)
+    for student in missing:
+        if student["username"] in user_ids:
+            student["id"] = user_ids[student["username"]]
+        else:
+            logger.warning("Student %s does not have a Gitlab account.", student["name"])
+
+    logger.info("Resolved %d of %d missing user ids.",
+                len([s for s in missing if "id" in s]), len(missing))
+
+
+def build_student_repo(conf, backend, hw_name, student):
+    """Builds the repository object for a student's copy of an assignment"""
+    full_name = backend.student_repo.build_name(
+        conf.semester, student["section"], hw_name, student["username"]
+    )
+    return backend.student_repo(conf.backend, conf.namespace, full_name)
+
+
+def build_student_repos(conf, backend, hw_name, roster, refresh=False):
+    """Builds the repository object for each student in the roster, looking
+    them all up at once (skipping the cache when refresh is set).
+    Returns the students' repositories in roster order.
+    """
+    repos = [build_student_repo(conf, backend, hw_name, student) for student in roster]
+    backend.student_repo.prefetch_info(
+        conf.backend, conf.namespace, repos, hw_name, refresh=refresh
+    )
+    return repos
@@ -0,0 +1,92 @@
+import contextlib
+import functools
+import glob
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+# How long an idle master connection lingers between git commands
+CONTROL_PERSIST = 60
+
+
+def _has_ssh_command_config():
+    """Whether git is configured with core.sshCommand, which GIT_SSH_COMMAND
+    would silently override
+    """
+    try:
+        result = subprocess.run(
+            ["git", "config", "--get", "core.sshCommand"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=10,
+            check=False,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return False
+    return result.returncode == 0
+
+
+@contextlib.contextmanager
+def multiplexed():
+    """
+    Shares one SSH connection per host among every git command run inside
+    the context by pointing GIT_SSH_COMMAND at an SSH control master.
+    The master connections are closed when the context exits.
+    """
+    if (
+        os.name != "posix"
+        or shutil.which("ssh") is None
+        or "GIT_SSH" in os.environ
+        or ("GIT_SSH_COMMAND" not in os.environ and _has_ssh_command_config())
+    ):
+        # No control masters here, or the user has their own SSH setup;
+        # let git connect however it normally would
+        yield
+        return
+
+    # Unix socket paths are short (~100 bytes); keep ours out of deep TMPDIRs
+    control_dir = tempfile.mkdtemp(
+        prefix="assigner-ssh-", dir="/tmp" if os.path.isdir("/tmp") else None
+    )
+    control_path = os.path.join(control_dir, "%C")
+
+    previous = os.environ.get("GIT_SSH_COMMAND")
+    os.environ["GIT_SSH_COMMAND"] = (
+        "{} -o ControlMaster=auto -o ControlPath={} -o ControlPersist={}".format(
+            previous or "ssh", control_path, CONTROL_PERSIST
+        )
+    )
+    logger.debug("Multiplexing SSH connections via %s", control_dir)
+
+    try:
+        yield
+    finally:
+        if previous is None:
+            del os.environ["GIT_SSH_COMMAND"]
+        else:
+            os.environ["GIT_SSH_COMMAND"] = previous
+
+        for socket in glob.glob(os.path.join(control_dir, "*")):
+            logger.debug("Closing SSH master connection %s", socket)
+            try:
+                # With a literal ControlPath, the host argument is ignored
+                subprocess.run(
+                    ["ssh", "-o", "ControlPath={}".format(socket), "-O", "exit", "assigner"],
+                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=10,
+                    check=False,
+                )
+            except (OSError, subprocess.SubprocessError) as e:
+                logger.debug("Could not close %s: %s", socket, e)
+
+        shutil.rmtree(control_dir, ignore_errors=True)
+
+
+def requires_multiplexed_ssh(func):
+    """Runs a command with multiplexed SSH connections for git"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with multiplexed():
+            return func(*args, **kwargs)
+    return wrapper
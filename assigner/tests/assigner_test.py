@@ -1,9 +1,9 @@
 import itertools
-from unittest.mock import patch
+from unittest.mock import call, patch, MagicMock
 
-from assigner import main, make_parser, subcommands
+from assigner import main, make_parser, manage_repos, subcommands
 from assigner.exceptions import AssignerException
-from assigner.tests.utils import AssignerTestCase
+from assigner.tests.utils import AssignerIntegrationTestCase, AssignerTestCase
 
 from git.cmd import GitCommandNotFound
 
@@ -181,3 +181,87 @@ class MainTestCase(AssignerTestCase):
         mock_logger.setLevel.assert_any_call(
             self.mock_args.verbosity
         )
+
+
+class ManageReposTestCase(AssignerIntegrationTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.roster = [
+            {"username": name, "id": i}
+            for i, name in enumerate(["alice", "bob", "carol", "dave"])
+        ]
+        self.mock_roster = self._create_patch(
+            "assigner.get_filtered_roster", return_value=self.roster
+        )
+        self._create_patch("assigner.resolve_user_ids")
+        self.mock_repos = self._create_patch(
+            "assigner.build_student_repos",
+            side_effect=lambda conf, backend, hw_name, students: [
+                MagicMock(username=s["username"]) for s in students
+            ],
+        )
+        self.mock_print = self._create_patch("builtins.print")
+        self.mock_args = MagicMock(dry_run=False, jobs=2)
+
+    def test_collects_failures(self):
+        """
+        manage_repos should keep changing the other repos when one fails,
+        then report the failure and how many repos changed.
+        """
+        error = Exception("carol's repo is gone")
+        changed = []
+
+        def action(repo, student):
+            if student["username"] == "carol":
+                raise error
+            changed.append(repo.username)
+            return student["username"] != "dave"
+
+        #pylint: disable=no-value-for-parameter
+        manage_repos(self.mock_args, action)
+
+        self.assertCountEqual(changed, ["alice", "bob", "dave"])
+        self.mock_print.assert_called_once_with("Changed 2 repositories.")
+        self.mock_logging.error.assert_has_calls([
+            call("Failed to change %d repositories:", 1),
+            call("  %s: %s", "carol", error),
+        ])
+
+    def test_skips_students_without_ids(self):
+        """
+        manage_repos should skip students who have no backend account.
+        """
+        del self.roster[1]["id"]
+        action = MagicMock(return_value=True)
+
+        #pylint: disable=no-value-for-parameter
+        manage_repos(self.mock_args, action)
+
+        students = self.mock_repos.call_args[0][3]
+        self.assertEqual([s["username"] for s in students], ["alice", "carol", "dave"])
+        self.assertEqual(action.call_count, 3)
+        self.mock_print.assert_called_once_with("Changed 3 repositories.")
+        self.assertFalse(self.mock_logging.error.called)
+
+    def test_plan_counts_requests_per_repo(self):
+        """
+        manage_repos --dry-run should estimate the action's requests on
+        every repo without changing any.
+        """
+        self._create_patch("assigner.plan.latency", return_value=None)
+        self._create_patch(
+            "assigner.build_student_repo",
+            return_value=MagicMock(**{"is_cached.return_value": True}),
+        )
+        self.mock_args.dry_run = True
+        action = MagicMock()
+
+        #pylint: disable=no-value-for-parameter
+        manage_repos(self.mock_args, action, requests=2)
+
+        self.assertFalse(action.called)
+        self.mock_print.assert_has_calls([
+            call("  change: 4"),
+            call("About 8 API requests and 0 pushes, taking roughly 2s."),
+        ])
@@ -0,0 +1,599 @@
+import os
+
+import git
+
+from requests.exceptions import HTTPError
+from unittest.mock import call, MagicMock, PropertyMock
+
+from assigner.backends.exceptions import BranchNotFound
+from assigner.backends.base import RepoError
+from assigner.backends.gitlab import GitlabRepo, GitlabStudentRepo, GitlabTemplateRepo
+from assigner.cache import NullCache, USER_TTL
+from assigner.tests.utils import AssignerTestCase
+
+
+CONFIG = {
+    "name": "gitlab",
+    "host": "https://gitlab.example.com",
+    "token": "xxx gitlab token xxx",
+}
+
+
+def make_response(json, next_url=None, status_code=200, headers=None):
+    response = MagicMock()
+    response.json.return_value = json
+    response.status_code = status_code
+    response.headers = headers or {}
+    response.links = {"next": {"url": next_url}} if next_url else {}
+    return response
+
+
+class PaginationTestCase(AssignerTestCase):
+    def setUp(self):
+        self.mock_requests = self._create_patch(
+            "assigner.backends.gitlab._session", autospec=True
+        ).return_value
+        self._create_patch(
+            "assigner.backends.gitlab.RateLimiter", autospec=True
+        )
+
+    def test_follows_next_links(self):
+        """
+        _cls_gl_get_paginated should yield items from every page.
+        """
+        self.mock_requests.request.side_effect = [
+            make_response([1, 2], "https://gitlab.example.com/api/v4/x?page=2"),
+            make_response([3]),
+        ]
+
+        items = list(GitlabRepo._cls_gl_get_paginated(CONFIG, "/x"))
+
+        self.assertEqual(items, [1, 2, 3])
+        self.assertEqual(self.mock_requests.request.call_count, 2)
+        _, kwargs = self.mock_requests.request.call_args
+        self.assertEqual(kwargs["params"], {})
+
+    def test_stops_early(self):
+        """
+        _cls_gl_get_paginated should not fetch pages nobody consumes.
+        """
+        self.mock_requests.request.side_effect = [
+            make_response([1, 2], "https://gitlab.example.com/api/v4/x?page=2"),
+            make_response([3]),
+        ]
+
+        first = next(GitlabRepo._cls_gl_get_paginated(CONFIG, "/x"))
+
+        self.assertEqual(first, 1)
+        self.assertEqual(self.mock_requests.request.call_count, 1)
+
+    def test_caps_per_page(self):
+        """
+        _cls_gl_get_paginated should never ask for more than Gitlab allows.
+        """
+        self.mock_requests.request.return_value = make_response([])
+
+        list(GitlabRepo._cls_gl_get_paginated(CONFIG, "/x", {"a": 1}, per_page=500))
+
+        _, kwargs = self.mock_requests.request.call_args
+        self.assertEqual(kwargs["params"], {"a": 1, "per_page": 100})
+
+
+class ThrottleRetryTestCase(AssignerTestCase):
+    def setUp(self):
+        self.mock_requests = self._create_patch(
+            "assigner.backends.gitlab._session", autospec=True
+        ).return_value
+        self.mock_limiter = self._create_patch(
+            "assigner.backends.gitlab.RateLimiter", autospec=True
+        ).for_host.return_value
+
+    def test_retries_throttled_requests(self):
+        """
+        _cls_gl_request should retry requests that Gitlab answers with a 429.
+        """
+        throttled = make_response({}, status_code=429, headers={"Retry-After": "1"})
+        self.mock_requests.request.side_effect = [throttled, make_response({"id": 1})]
+
+        result = GitlabRepo._cls_gl_get(CONFIG, "/x")
+
+        self.assertEqual(result, {"id": 1})
+        self.assertEqual(self.mock_limiter.acquire.call_count, 2)
+        self.mock_limiter.update.assert_any_call(throttled.headers, 429)
+
+
+class PrefetchInfoTestCase(AssignerTestCase):
+    def setUp(self):
+        self.mock_get_cache = self._create_patch(
+            "assigner.backends.gitlab.get_cache", return_value=NullCache()
+        )
+        self.mock_get_paginated = self._create_patch(
+            "assigner.backends.gitlab.GitlabRepo._cls_gl_get_paginated"
+        )
+
+    def test_hydrates_info(self):
+        """
+        prefetch_info should fill in info from one listing of the namespace.
+        """
+        self.mock_get_paginated.return_value = iter([
+            {"path": "a", "id": 1, "namespace": {"id": 3}, "ssh_url_to_repo": "a"},
+            {"path": "b", "id": 2, "namespace": {"id": 3}, "ssh_url_to_repo": "b"},
+        ])
+        repos = [GitlabRepo(CONFIG, "group", name) for name in ("a", "b", "c")]
+
+        GitlabRepo.prefetch_info(CONFIG, "group", repos, "hw1")
+
+        self.mock_get_paginated.assert_called_once_with(
+            CONFIG, "/groups/group/projects", {"with_shared": False, "search": "hw1"}
+        )
+        self.assertEqual(repos[0].id, 1)
+        self.assertEqual(repos[1].id, 2)
+        self.assertFalse(repos[2].already_exists())
+
+    def test_short_search_lists_everything(self):
+        """
+        prefetch_info should not search for names Gitlab can't match partially.
+        """
+        self.mock_get_paginated.return_value = iter([
+            {"path": "a", "id": 1, "namespace": {"id": 3}, "ssh_url_to_repo": "a"},
+        ])
+        repos = [GitlabRepo(CONFIG, "group", name) for name in ("a", "b")]
+
+        GitlabRepo.prefetch_info(CONFIG, "group", repos, "p1")
+
+        self.mock_get_paginated.assert_called_once_with(
+            CONFIG, "/groups/group/projects", {"with_shared": False}
+        )
+        self.assertEqual(repos[0].id, 1)
+
+    def test_skips_sweep_when_cached(self):
+        """
+        prefetch_info should not list projects when all repos are cached.
+        """
+        self.mock_get_cache.return_value = MagicMock(**{
+            "get.return_value": {"id": 1, "namespace_id": 2, "ssh_url": "url"}
+        })
+        repos = [GitlabRepo(CONFIG, "group", name) for name in ("a", "b")]
+
+        GitlabRepo.prefetch_info(CONFIG, "group", repos, "hw1")
+
+        self.assertFalse(self.mock_get_paginated.called)
+        self.assertEqual(repos[0].id, 1)
+
+    def test_refresh_always_sweeps(self):
+        """
+        prefetch_info should list projects when asked to refresh.
+        """
+        self.mock_get_cache.return_value = MagicMock(**{
+            "get.return_value": {"id": 1, "namespace_id": 2, "ssh_url": "url"}
+        })
+        self.mock_get_paginated.return_value = iter([])
+        repos = [GitlabRepo(CONFIG, "group", name) for name in ("a", "b")]
+
+        GitlabRepo.prefetch_info(CONFIG, "group", repos, "hw1", refresh=True)
+
+        self.assertTrue(self.mock_get_paginated.called)
+        self.assertFalse(repos[0].already_exists())
+
+    def test_invalidates_missing_repos(self):
+        """
+        prefetch_info should drop cached metadata for repos that are gone.
+        """
+        cache = MagicMock(**{
+            "get.return_value": {"id": 1, "namespace_id": 2, "ssh_url": "url"}
+        })
+        self.mock_get_cache.return_value = cache
+        self.mock_get_paginated.return_value = iter([])
+        repos = [GitlabRepo(CONFIG, "group", name) for name in ("a", "b")]
+        self.assertTrue(repos[0].is_cached())
+
+        GitlabRepo.prefetch_info(CONFIG, "group", repos, "hw1", refresh=True)
+
+        self.assertFalse(repos[0].is_cached())
+        self.assertFalse(repos[0].already_exists())
+        cache.invalidate.assert_any_call(CONFIG["host"], "/projects/group%2Fa")
+
+
+class GetUserIdsTestCase(AssignerTestCase):
+    def setUp(self):
+        self.mock_get = self._create_patch(
+            "assigner.backends.gitlab.GitlabRepo._cls_gl_get"
+        )
+        self.mock_cache = self._create_patch(
+            "assigner.backends.gitlab.get_cache"
+        ).return_value
+        self.mock_cache.get.return_value = None
+
+    def test_exact_deduplicated_lookups(self):
+        """
+        get_user_ids should look up each distinct username exactly once.
+        """
+        ids = {"a": 1, "b": 2}
+        self.mock_get.side_effect = lambda config, path, params: (
+            [{"id": ids[params["username"]]}] if params["username"] in ids else []
+        )
+
+        result = GitlabRepo.get_user_ids(["a", "b", "a", "c"], CONFIG)
+
+        self.assertEqual(result, {"a": 1, "b": 2})
+        self.assertEqual(self.mock_get.call_count, 3)
+        self.assertEqual(self.mock_cache.set.call_count, 2)
+
+    def test_uses_cache(self):
+        """
+        get_user_ids should not look up cached users.
+        """
+        self.mock_cache.get.return_value = 7
+
+        self.assertEqual(GitlabRepo.get_user_ids(["a"], CONFIG), {"a": 7})
+        self.assertFalse(self.mock_get.called)
+
+
+class MirrorTestCase(AssignerTestCase):
+    def setUp(self):
+        tmpdir = self._create_tempdir()
+
+        self.origin = git.Repo.init(os.path.join(tmpdir, "origin"))
+        self.commit("first")
+        self.mirror = os.path.join(tmpdir, "cache", "hw1.git")
+
+        self._create_patch(
+            "assigner.backends.gitlab.GitlabRepo.ssh_url", new_callable=PropertyMock
+        ).return_value = self.origin.working_dir
+        self.repo = GitlabRepo(CONFIG, "ns", "hw1")
+
+    def commit(self, message):
+        with self.origin.config_writer() as writer:
+            writer.set_value("user", "name", "Test")
+            writer.set_value("user", "email", "test@example.com")
+        return self.origin.index.commit(message)
+
+    def test_clones_then_fetches(self):
+        """
+        mirror_to should clone a bare mirror once and fetch into it afterwards.
+        """
+        branch = self.origin.active_branch.name
+        mirrored = self.repo.mirror_to(self.mirror, [branch])
+        self.assertTrue(mirrored.bare)
+
+        second = self.commit("second")
+        mirrored = GitlabRepo(CONFIG, "ns", "hw1").mirror_to(self.mirror, [branch])
+        self.assertEqual(mirrored.heads[branch].commit.hexsha, second.hexsha)
+
+    def test_missing_branch(self):
+        """
+        mirror_to should raise BranchNotFound for branches the template lacks.
+        """
+        with self.assertRaises(BranchNotFound):
+            self.repo.mirror_to(self.mirror, ["nope"])
+
+
+class PushToTestCase(AssignerTestCase):
+    def setUp(self):
+        self.tmpdir = self._create_tempdir()
+        self._create_patch("assigner.backends.gitlab.record_latency")
+
+        local = git.Repo.init(os.path.join(self.tmpdir, "hw1"), initial_branch="master")
+        with local.config_writer() as writer:
+            writer.set_value("user", "name", "Test")
+            writer.set_value("user", "email", "test@example.com")
+        self.head = local.index.commit("first")
+
+        self.template = GitlabTemplateRepo(CONFIG, "ns", "hw1")
+        self.template._repo = local
+
+    def student(self, name):
+        path = os.path.join(self.tmpdir, name + ".git")
+        git.Repo.init(path, bare=True)
+        return MagicMock(ssh_url=path)
+
+    def test_pushes_without_remotes(self):
+        """
+        push_to should push to each student's URL without adding remotes.
+        """
+        students = [self.student("hw1-a"), self.student("hw1-b")]
+        with open(os.path.join(self.template.repo.git_dir, "config"), encoding="utf-8") as f:
+            config = f.read()
+
+        for student in students:
+            self.template.push_to(student, "master")
+
+        for student in students:
+            pushed = git.Repo(student.ssh_url)
+            self.assertEqual(pushed.heads.master.commit.hexsha, self.head.hexsha)
+        self.assertEqual(self.template.repo.remotes, [])
+        with open(os.path.join(self.template.repo.git_dir, "config"), encoding="utf-8") as f:
+            self.assertEqual(f.read(), config)
+
+    def test_push_failure(self):
+        """
+        push_to should raise RepoError when the push fails.
+        """
+        student = MagicMock(ssh_url=os.path.join(self.tmpdir, "missing.git"))
+        with self.assertRaises(RepoError):
+            self.template.push_to(student, ["master"])
+
+
+def not_found():
+    response = MagicMock(status_code=404)
+    return HTTPError(response=response)
+
+
+class WaitForDeletionTestCase(AssignerTestCase):
+    def setUp(self):
+        self.mock_get = self._create_patch(
+            "assigner.backends.gitlab.GitlabRepo._gl_get"
+        )
+        self.mock_delete = self._create_patch(
+            "assigner.backends.gitlab.GitlabRepo._gl_delete"
+        )
+        self.mock_sleep = self._create_patch("assigner.backends.gitlab_mixins.sleep")
+        self.repo = GitlabRepo(CONFIG, "ns", "hw1")
+
+    def test_polls_until_gone(self):
+        """
+        wait_for_deletion should return once the repo's path 404s.
+        """
+        self.mock_get.side_effect = [
+            {"id": 1, "path_with_namespace": "ns/hw1"},
+            {"id": 1, "path_with_namespace": "ns/hw1"},
+            not_found(),
+        ]
+
+        self.repo.wait_for_deletion()
+
+        self.assertEqual(self.mock_get.call_count, 3)
+        self.assertEqual(self.mock_sleep.call_count, 2)
+        self.assertFalse(self.mock_delete.called)
+
+    def test_removes_marked_repos(self):
+        """
+        wait_for_deletion should permanently remove repos that are only
+        marked for deletion, once.
+        """
+        marked = {
+            "id": 1,
+            "path_with_namespace": "ns/hw1",
+            "marked_for_deletion_on": "2026-10-17",
+        }
+        self.mock_get.side_effect = [marked, marked, not_found()]
+
+        self.repo.wait_for_deletion()
+
+        self.mock_delete.assert_called_once_with(
+            "/projects/1", {"permanently_remove": True, "full_path": "ns/hw1"}
+        )
+
+
+class ListAuthorizedEmailsTestCase(AssignerTestCase):
+    def setUp(self):
+        self.mock_get_paginated = self._create_patch(
+            "assigner.backends.gitlab.GitlabRepo._cls_gl_get_paginated"
+        )
+        self.mock_get = self._create_patch(
+            "assigner.backends.gitlab.GitlabRepo._cls_gl_get"
+        )
+        self._create_patch(
+            "assigner.backends.gitlab.get_cache"
+        ).return_value = NullCache()
+        self._create_patch("assigner.backends.gitlab.GitlabRepo._emails", new={})
+        self._create_patch(
+            "assigner.backends.gitlab.GitlabRepo.id", new_callable=PropertyMock
+        ).return_value = 1
+
+    def test_shares_emails_across_repos(self):
+        """
+        list_authorized_emails should look up each maintainer only once.
+        """
+        self.mock_get_paginated.return_value = [
+            {"id": 7, "access_level": 50},
+            {"id": 8, "access_level": 40},
+            {"id": 9, "access_level": 30},
+        ]
+        self.mock_get.side_effect = lambda config, path: {
+            "/users/7": {"public_email": "prof@example.edu"},
+            "/users/8": {"public_email": ""},
+        }[path]
+
+        for name in ("hw1-a", "hw1-b", "hw1-c"):
+            emails = GitlabRepo(CONFIG, "ns", name).list_authorized_emails()
+            self.assertEqual(emails, ["prof@example.edu"])
+
+        self.assertEqual(self.mock_get.call_count, 2)
+
+    def test_does_not_cache_missing_emails(self):
+        """
+        get_user_email should only cache emails that users have made public.
+        """
+        cache = MagicMock(**{"get.return_value": None})
+        self._create_patch("assigner.backends.gitlab.get_cache").return_value = cache
+        self.mock_get.side_effect = lambda config, path: {
+            "/users/7": {"public_email": "prof@example.edu"},
+            "/users/8": {"public_email": None},
+        }[path]
+
+        self.assertEqual(GitlabRepo.get_user_email(CONFIG, 7), "prof@example.edu")
+        self.assertEqual(GitlabRepo.get_user_email(CONFIG, 8), "")
+
+        cache.set.assert_called_once_with(
+            CONFIG["host"], "/users/7/public_email", "prof@example.edu", USER_TTL
+        )
+
+
+def project(name, id, **kwargs):
+    info = {
+        "path": name,
+        "id": id,
+        "namespace": {"id": 3},
+        "ssh_url_to_repo": "git@gitlab.example.com:ns/{}.git".format(name),
+    }
+    info.update(kwargs)
+    return info
+
+
+class ForkTestCase(AssignerTestCase):
+    def setUp(self):
+        self._create_patch(
+            "assigner.backends.gitlab.get_cache", return_value=NullCache()
+        )
+        self.mock_post = self._create_patch(
+            "assigner.backends.gitlab.GitlabRepo._cls_gl_post"
+        )
+        self.template = GitlabRepo(CONFIG, "ns", "hw1")
+        self.template._remember(project("hw1", 5))
+
+    def test_forks_template(self):
+        """
+        fork should fork the template into the namespace under the student's
+        repo name.
+        """
+        self.mock_post.return_value = project("2017SP-A-hw1-student", 6)
+
+        repo = GitlabStudentRepo.fork(self.template, "2017SP", "A", "student")
+
+        self.mock_post.assert_called_once_with(CONFIG, "/projects/5/fork", {
+            "name": "2017SP-A-hw1-student",
+            "path": "2017SP-A-hw1-student",
+            "namespace_id": 3,
+            "visibility": "private",
+        })
+        self.assertEqual(repo.name, "2017SP-A-hw1-student")
+        self.assertEqual(repo.id, 6)
+
+
+class WaitForImportsTestCase(AssignerTestCase):
+    def setUp(self):
+        self._create_patch(
+            "assigner.backends.gitlab.get_cache", return_value=NullCache()
+        )
+        self.mock_get_paginated = self._create_patch(
+            "assigner.backends.gitlab.GitlabRepo._cls_gl_get_paginated"
+        )
+        self.mock_get = self._create_patch(
+            "assigner.backends.gitlab.GitlabRepo._gl_get"
+        )
+        self.mock_sleep = self._create_patch("assigner.backends.gitlab_mixins.sleep")
+        self.mock_monotonic = self._create_patch(
+            "assigner.backends.gitlab_mixins.monotonic", return_value=0
+        )
+
+        self.repos = []
+        for i, name in enumerate(("hw1-a", "hw1-b")):
+            repo = GitlabStudentRepo(CONFIG, "ns", name)
+            repo._remember(project(name, i + 1))
+            self.repos.append(repo)
+
+    def test_polls_until_finished(self):
+        """
+        wait_for_imports should poll the namespace until every import finishes.
+        """
+        self.mock_get_paginated.side_effect = [
+            [
+                project("hw1-a", 1, import_status="started"),
+                project("hw1-b", 2, import_status="finished"),
+            ],
+            [
+                project("hw1-a", 1, import_status="finished"),
+                project("hw1-b", 2, import_status="finished"),
+            ],
+        ]
+
+        failed = GitlabStudentRepo.wait_for_imports(self.repos, "hw1")
+
+        self.assertEqual(failed, [])
+        self.assertEqual(self.mock_get_paginated.call_count, 2)
+        self.mock_get_paginated.assert_called_with(
+            CONFIG, "/groups/ns/projects", {"with_shared": False, "search": "hw1"}
+        )
+        self.assertEqual(self.mock_sleep.call_count, 1)
+        self.assertFalse(self.mock_get.called)
+
+    def test_reports_failed_imports(self):
+        """
+        wait_for_imports should return repos whose import failed.
+        """
+        self.mock_get_paginated.return_value = [
+            project("hw1-a", 1, import_status="failed"),
+            project("hw1-b", 2, import_status="finished"),
+        ]
+
+        failed = GitlabStudentRepo.wait_for_imports(self.repos, "hw1")
+
+        self.assertEqual(failed, [self.repos[0]])
+        self.assertFalse(self.mock_sleep.called)
+
+    def test_times_out(self):
+        """
+        wait_for_imports should give up on imports that never finish.
+        """
+        self.mock_get_paginated.return_value = [
+            project("hw1-a", 1, import_status="started"),
+            project("hw1-b", 2, import_status="finished"),
+        ]
+        self.mock_monotonic.side_effect = [0, 1, GitlabStudentRepo.IMPORT_TIMEOUT + 1]
+
+        with self.assertRaises(RepoError):
+            GitlabStudentRepo.wait_for_imports(self.repos, "hw1")
+        self.assertEqual(self.mock_sleep.call_count, 1)
+
+    def test_falls_back_to_each_project(self):
+        """
+        wait_for_imports should check each repo when the namespace isn't a group.
+        """
+        self.mock_get_paginated.side_effect = not_found()
+        self.mock_get.side_effect = lambda path: {
+            "/projects/1/import": {"import_status": "finished"},
+            "/projects/2/import": {"import_status": "none"},
+        }[path]
+
+        failed = GitlabStudentRepo.wait_for_imports(self.repos, "hw1")
+
+        self.assertEqual(failed, [])
+        self.assertEqual(self.mock_get.call_count, 2)
+
+
+class DetachForkTestCase(AssignerTestCase):
+    def setUp(self):
+        self._create_patch(
+            "assigner.backends.gitlab.get_cache", return_value=NullCache()
+        )
+        self.mock_delete = self._create_patch(
+            "assigner.backends.gitlab.GitlabRepo._gl_delete"
+        )
+        self.mock_put = self._create_patch(
+            "assigner.backends.gitlab.GitlabRepo._gl_put"
+        )
+        self._create_patch(
+            "assigner.backends.gitlab.GitlabRepo.list_branches"
+        ).return_value = [
+            {"name": "main"},
+            {"name": "master"},
+            {"name": "solution"},
+            {"name": "feature/x"},
+        ]
+        self.repo = GitlabStudentRepo(CONFIG, "ns", "hw1-a")
+        self.repo._remember(project("hw1-a", 1, default_branch="main"))
+
+    def test_removes_unrequested_branches(self):
+        """
+        detach_fork should unlink the fork and delete only the branches that
+        weren't requested.
+        """
+        self.repo.detach_fork(["master", "solution"])
+
+        self.mock_put.assert_called_once_with(
+            "/projects/1", {"default_branch": "master"}
+        )
+        self.assertEqual(self.mock_delete.call_args_list, [
+            call("/projects/1/fork"),
+            call("/projects/1/repository/branches/main"),
+            call("/projects/1/repository/branches/feature%2Fx"),
+        ])
+
+    def test_keeps_requested_default_branch(self):
+        """
+        detach_fork should leave the default branch alone if it was requested.
+        """
+        self.repo.detach_fork(["main"])
+
+        self.assertFalse(self.mock_put.called)
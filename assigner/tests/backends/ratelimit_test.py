@@ -0,0 +1,92 @@
+import time
+
+from assigner.backends.ratelimit import RateLimiter
+from assigner.tests.utils import AssignerTestCase
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, duration):
+        self.slept.append(duration)
+        self.now += duration
+
+
+class RateLimiterTestCase(AssignerTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.limiter = RateLimiter(
+            low_water=4, clock=self.clock, sleep=self.clock.sleep
+        )
+
+    def reset_in(self, seconds):
+        return str(int(time.time() + seconds))
+
+    def test_no_wait_without_headers(self):
+        """
+        RateLimiter should not delay requests before it knows the limit.
+        """
+        for _ in range(10):
+            self.assertEqual(self.limiter.acquire(), 0.0)
+        self.assertEqual(self.clock.slept, [])
+
+    def test_no_wait_with_plenty_remaining(self):
+        """
+        RateLimiter should not delay requests while many tokens remain.
+        """
+        self.limiter.update(
+            {"RateLimit-Remaining": "100", "RateLimit-Reset": self.reset_in(60)}
+        )
+        for _ in range(10):
+            self.limiter.acquire()
+        self.assertEqual(self.clock.slept, [])
+
+    def test_paces_when_nearly_exhausted(self):
+        """
+        RateLimiter should spread the last few tokens over the window.
+        """
+        self.limiter.update(
+            {"RateLimit-Remaining": "4", "RateLimit-Reset": self.reset_in(40)}
+        )
+        for _ in range(3):
+            self.limiter.acquire()
+
+        self.assertEqual(len(self.clock.slept), 2)
+        self.assertGreater(self.limiter.waited, 10)
+
+    def test_waits_for_reset_when_exhausted(self):
+        """
+        RateLimiter should hold requests until the window resets.
+        """
+        self.limiter.update(
+            {"RateLimit-Remaining": "0", "RateLimit-Reset": self.reset_in(30)}
+        )
+        waited = self.limiter.acquire()
+        self.assertAlmostEqual(waited, 30, delta=1.5)
+
+    def test_holds_every_caller_when_exhausted(self):
+        """
+        RateLimiter should hold concurrent callers until the window resets,
+        not just the first one.
+        """
+        self.limiter.update(
+            {"RateLimit-Remaining": "0", "RateLimit-Reset": self.reset_in(30)}
+        )
+        # Callers on other threads all arrive before anyone finishes waiting
+        self.limiter._sleep = lambda duration: None
+        waits = [self.limiter.acquire() for _ in range(4)]
+        for waited in waits:
+            self.assertAlmostEqual(waited, 30, delta=1.5)
+
+    def test_honors_retry_after(self):
+        """
+        RateLimiter should block requests for Retry-After seconds after a 429.
+        """
+        self.limiter.update({"Retry-After": "7"}, 429)
+        self.assertAlmostEqual(self.limiter.acquire(), 7)
+        self.assertEqual(self.limiter.throttled, 1)
@@ -0,0 +1,54 @@
+import os
+
+from assigner.cache import MetadataCache, latency, record_latency, save_latencies
+from assigner.tests.utils import AssignerTestCase
+
+
+class MetadataCacheTestCase(AssignerTestCase):
+    def setUp(self):
+        self.cache = MetadataCache(os.path.join(self._create_tempdir(), "sub", "cache.sqlite"))
+
+    def test_round_trip(self):
+        """
+        MetadataCache should return what was stored for a host and path.
+        """
+        self.cache.set("https://a", "/projects/x", {"id": 1}, 60)
+        self.assertEqual(self.cache.get("https://a", "/projects/x"), {"id": 1})
+        self.assertIsNone(self.cache.get("https://b", "/projects/x"))
+
+    def test_expiry(self):
+        """
+        MetadataCache should not return expired entries.
+        """
+        self.cache.set("https://a", "/projects/x", {"id": 1}, -1)
+        self.assertIsNone(self.cache.get("https://a", "/projects/x"))
+
+    def test_invalidate(self):
+        """
+        MetadataCache should forget invalidated entries.
+        """
+        self.cache.set("https://a", "/users?search=x", 5, 60)
+        self.cache.invalidate("https://a", "/users?search=x")
+        self.assertIsNone(self.cache.get("https://a", "/users?search=x"))
+
+
+class LatencyTestCase(AssignerTestCase):
+    def setUp(self):
+        self.cache = MetadataCache(os.path.join(self._create_tempdir(), "cache.sqlite"))
+        self._create_patch("assigner.cache.get_cache").return_value = self.cache
+        self._create_patch("assigner.cache._latencies", new={})
+
+    def test_averages_across_runs(self):
+        """
+        latency should average what was recorded this run with saved runs.
+        """
+        self.assertIsNone(latency("https://a", "push"))
+
+        record_latency("https://a", "push", 1.0)
+        record_latency("https://a", "push", 3.0)
+        self.assertEqual(latency("https://a", "push"), 2.0)
+
+        save_latencies()
+        record_latency("https://a", "push", 5.0)
+        self.assertEqual(latency("https://a", "push"), 3.0)
+        self.assertIsNone(latency("https://a", "request"))
@@ -0,0 +1,102 @@
+import threading
+
+from requests.exceptions import HTTPError
+from unittest.mock import MagicMock
+
+from assigner.canvas_util import _session, CanvasAPI, CanvasProgressFailed
+from assigner.tests.utils import AssignerTestCase
+
+
+class CanvasAPITestCase(AssignerTestCase):
+    def setUp(self):
+        self.mock_session = self._create_patch(
+            "assigner.canvas_util._session"
+        ).return_value
+        self.mock_sleep = self._create_patch("assigner.canvas_util.time.sleep")
+        self.api = CanvasAPI("token", "canvas.example.edu")
+
+    def test_update_grades(self):
+        """
+        update_grades should post every grade in a single request.
+        """
+        self.mock_session.request.return_value.json.return_value = {"id": 3}
+
+        result = self.api.update_grades(1, 2, {11: "90%", 12: "75.5%"})
+
+        self.assertEqual(result, {"id": 3})
+        self.mock_session.request.assert_called_once()
+        args, kwargs = self.mock_session.request.call_args
+        self.assertEqual(args[0], "POST")
+        self.assertEqual(
+            args[1],
+            "https://canvas.example.edu/api/v1/courses/1/assignments/2/submissions/update_grades",
+        )
+        self.assertEqual(kwargs["json"], {"grade_data": {
+            "11": {"posted_grade": "90%"},
+            "12": {"posted_grade": "75.5%"},
+        }})
+
+    def test_retries_server_errors(self):
+        """
+        Requests should be retried when Canvas has a server error.
+        """
+        failure = MagicMock()
+        failure.raise_for_status.side_effect = HTTPError(
+            response=MagicMock(status_code=502)
+        )
+        success = MagicMock(headers={})
+        success.json.return_value = {"id": 3}
+        self.mock_session.request.side_effect = [failure, success]
+
+        self.assertEqual(self.api.update_grades(1, 2, {11: "90%"}), {"id": 3})
+        self.assertEqual(self.mock_session.request.call_count, 2)
+        self.assertEqual(self.mock_sleep.call_count, 1)
+
+    def test_does_not_retry_client_errors(self):
+        """
+        Requests should not be retried when Canvas rejects them.
+        """
+        failure = MagicMock()
+        failure.raise_for_status.side_effect = HTTPError(
+            response=MagicMock(status_code=400)
+        )
+        self.mock_session.request.return_value = failure
+
+        with self.assertRaises(HTTPError):
+            self.api.get_assignment(1, 2)
+        self.assertEqual(self.mock_session.request.call_count, 1)
+
+    def test_wait_for_progress(self):
+        """
+        wait_for_progress should poll until the job completes.
+        """
+        self.api._get_request = MagicMock(side_effect=[
+            ({"id": 3, "workflow_state": "running"}, ""),
+            ({"id": 3, "workflow_state": "completed"}, ""),
+        ])
+
+        result = self.api.wait_for_progress({"id": 3, "workflow_state": "queued"})
+
+        self.assertEqual(result["workflow_state"], "completed")
+        self.assertEqual(self.api._get_request.call_count, 2)
+
+    def test_wait_for_failed_progress(self):
+        """
+        wait_for_progress should raise when the job fails.
+        """
+        with self.assertRaises(CanvasProgressFailed):
+            self.api.wait_for_progress({"id": 3, "workflow_state": "failed"})
+
+
+class SessionTestCase(AssignerTestCase):
+    def test_session_per_thread(self):
+        """
+        Each thread should get its own session, reused for its requests.
+        """
+        sessions = []
+        thread = threading.Thread(target=lambda: sessions.append(_session()))
+        thread.start()
+        thread.join()
+
+        self.assertIs(_session(), _session())
+        self.assertIsNot(sessions[0], _session())
@@ -0,0 +1,110 @@
+from unittest.mock import call, MagicMock
+
+from assigner.commands.assign import _assign, reconcile, PUSH, PROTECT, SKIP
+from assigner.tests.utils import AssignerTestCase
+
+
+class ReconcileTestCase(AssignerTestCase):
+    def setUp(self):
+        self.repo = MagicMock()
+        self.repo.is_empty.return_value = False
+        self.repo.list_branches.return_value = [
+            {"name": "master", "protected": True},
+            {"name": "dev", "protected": False},
+        ]
+
+    def test_empty_repo(self):
+        """
+        reconcile should push to empty repos.
+        """
+        self.repo.is_empty.return_value = True
+        self.assertEqual(reconcile(self.repo, ["master"]), (PUSH, ["master"]))
+        self.assertFalse(self.repo.list_branches.called)
+
+    def test_unprotected_default_branch(self):
+        """
+        reconcile should protect master when no branches were requested.
+        """
+        self.repo.list_branches.return_value = [{"name": "master", "protected": False}]
+        self.assertEqual(reconcile(self.repo, ["master"]), (PROTECT, []))
+
+    def test_missing_branches(self):
+        """
+        reconcile should push only the missing branches.
+        """
+        self.assertEqual(
+            reconcile(self.repo, ["master", "solution"]), (PUSH, ["solution"])
+        )
+
+    def test_unprotected_branches(self):
+        """
+        reconcile should protect branches that aren't protected.
+        """
+        self.assertEqual(reconcile(self.repo, ["master", "dev"]), (PROTECT, []))
+
+    def test_up_to_date(self):
+        """
+        reconcile should skip repos that have nothing missing.
+        """
+        self.assertEqual(reconcile(self.repo, ["master"]), (SKIP, []))
+
+
+class AssignTestCase(AssignerTestCase):
+    def setUp(self):
+        self.mock_roster = self._create_patch(
+            "assigner.commands.assign.get_filtered_roster", autospec=True
+        )
+        self.mock_roster.return_value = [
+            {"section": "A", "username": "student1"},
+            {"section": "A", "username": "student2"},
+        ]
+        self._create_patch(
+            "assigner.commands.assign.cache.mirror_path", return_value=None
+        )
+
+        self.mock_backend = MagicMock()
+        self.template = self.mock_backend.template_repo.return_value
+        self.repo = self.mock_backend.student_repo.return_value
+        self.repo.already_exists.return_value = True
+        self.repo.is_empty.return_value = True
+
+        self.mock_args = MagicMock(
+            branch=None, dry_run=False, force=False, fork=True, reconcile=True,
+            open=False, section=None, student=None, jobs=1, push_jobs=1,
+        )
+
+    def test_fork_reconcile_pushes_to_empty_repos(self):
+        """
+        assign --fork --reconcile should clone the template to push to
+        empty repos.
+        """
+        _assign(MagicMock(), self.mock_backend, self.mock_args)
+
+        self.assertTrue(self.template.clone_to.called)
+        self.repo.push.assert_has_calls([call(self.template, ["master"])] * 2)
+        self.assertFalse(self.mock_backend.student_repo.fork.called)
+
+    def test_fork_creates_repos_server_side(self):
+        """
+        assign --fork should fork missing repos, wait for the imports, and
+        only then detach and protect them.
+        """
+        self.repo.already_exists.return_value = False
+        self.mock_args.reconcile = False
+        self.mock_args.branch = ["master", "solution"]
+        forked = [MagicMock(), MagicMock()]
+        self.mock_backend.student_repo.fork.side_effect = forked
+        self.mock_backend.student_repo.wait_for_imports.return_value = [forked[1]]
+
+        _assign(MagicMock(), self.mock_backend, self.mock_args)
+
+        self.assertEqual(self.mock_backend.student_repo.fork.call_count, 2)
+        self.mock_backend.student_repo.wait_for_imports.assert_called_once_with(
+            forked, self.mock_args.name
+        )
+        for repo in forked:
+            self.assertFalse(repo.push.called)
+        forked[0].detach_fork.assert_called_once_with(["master", "solution"])
+        forked[0].protect.assert_has_calls([call("master"), call("solution")])
+        self.assertFalse(forked[1].detach_fork.called)
+        self.assertFalse(forked[1].protect.called)
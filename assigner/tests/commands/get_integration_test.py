@@ -1,7 +1,14 @@
-from unittest.mock import call, MagicMock
+import os
+import shutil
+import threading
 
-from assigner.backends.base import BackendBase
-from assigner.commands.get import _get as get
+import git
+
+from unittest.mock import call, patch, MagicMock
+
+from assigner.backends.base import BackendBase, RepoError
+from assigner.backends.gitlab import GitlabStudentRepo
+from assigner.commands.get import _get as get, _get_one
 from assigner.tests.utils import AssignerIntegrationTestCase
 
 
@@ -30,7 +37,7 @@ class GetIntegrationTestCase(AssignerIntegrationTestCase):
             "branch": ["a", "b"],
             "force": MagicMock()
         })
-        self.mock_args = MagicMock()
+        self.mock_args = MagicMock(jobs=1)
 
     def test_get_no_students(self):
         """
@@ -52,6 +59,7 @@ class GetIntegrationTestCase(AssignerIntegrationTestCase):
         Test getting some student repositories.
         """
         self.mock_roster.return_value = [MagicMock(), MagicMock()]
+        self.mock_args.branch = ["a", "b"]
         get(self.mock_conf, self.mock_backend, self.mock_args)
 
         for student in self.mock_roster.return_value:
@@ -75,6 +83,122 @@ class GetIntegrationTestCase(AssignerIntegrationTestCase):
             for b in self.mock_args.branch:
                 self.assertTrue(studentrepo.get_head(b).checkout.called)
 
-            studentrepo.pull.assert_has_calls(
-                [call(b) for b in self.mock_args.branches]
+            studentrepo.merge_fetched.assert_has_calls(
+                [call(b) for b in self.mock_args.branch]
             )
+
+    def test_get_concurrently(self):
+        """
+        Test getting repositories concurrently: a failure should not stop
+        the others, and changes should still be reported in roster order.
+        """
+        self.mock_roster.return_value = [
+            {"section": "1", "username": name, "name": name.title()}
+            for name in ("alice", "bob", "carol", "dave")
+        ]
+        self.mock_args.jobs = 2
+        bob_done = threading.Event()
+
+        def get_one(*args):
+            # args[4] is the repo directory built from the username below
+            username = args[4].username
+            if username == "alice":
+                # Finish after bob so results arrive out of roster order
+                bob_done.wait(5)
+            elif username == "bob":
+                bob_done.set()
+            elif username == "carol":
+                raise RepoError("carol's repo is gone")
+            return ["{} changed".format(username)]
+
+        self._create_patch(
+            "assigner.commands.get._get_one", side_effect=get_one
+        )
+        self.mock_os.path.join.side_effect = lambda path, name: MagicMock(username=name)
+
+        with self.assertLogs(level="ERROR") as logs:
+            get(self.mock_conf, self.mock_backend, self.mock_args)
+
+        rows = self.mock_prettytable.return_value.add_row.call_args_list
+        self.assertEqual(
+            [row[0][0][4] for row in rows],
+            ["alice changed", "bob changed", "dave changed"],
+        )
+        self.assertEqual(
+            logs.output,
+            [
+                "ERROR:root:Failed to get 1 repositories:",
+                "ERROR:root:  carol: carol's repo is gone",
+            ],
+        )
+
+
+class GetOneTestCase(AssignerIntegrationTestCase):
+    integration = True
+
+    def setUp(self):
+        super().setUp()
+        self.tmpdir = self._create_tempdir()
+
+        self.upstream = os.path.join(self.tmpdir, "upstream.git")
+        git.Repo.init(self.upstream, bare=True, initial_branch="master")
+        self.student = self.make_clone("student")
+        self.commit("main.py", "first")
+        self.student.git.push("origin", "master")
+        self.student.git.checkout("-b", "dev")
+        self.commit("dev.py", "dev")
+        self.student.git.push("origin", "dev")
+
+        self.local_dir = os.path.join(self.tmpdir, "local")
+        git.Repo.clone_from(self.upstream, self.local_dir).git.branch("dev", "origin/dev")
+
+        self.mock_backend = MagicMock()
+        self.mock_backend.student_repo.side_effect = GitlabStudentRepo
+
+    def make_clone(self, name):
+        clone = git.Repo.clone_from(self.upstream, os.path.join(self.tmpdir, name))
+        with clone.config_writer() as writer:
+            writer.set_value("user", "name", "Student")
+            writer.set_value("user", "email", "student@example.edu")
+        return clone
+
+    def commit(self, filename, message):
+        with open(os.path.join(self.student.working_dir, filename), "a", encoding="utf-8") as f:
+            f.write(message + "\n")
+        self.student.index.add([filename])
+        return self.student.index.commit(message).hexsha
+
+    def test_merges_from_single_fetch(self):
+        """
+        _get_one should fetch once and update every branch from that fetch
+        without contacting the remote again.
+        """
+        self.student.git.checkout("master")
+        master = self.commit("main.py", "more work")
+        self.student.git.checkout("dev")
+        dev = self.commit("dev.py", "more dev work")
+        self.student.git.push("origin", "master", "dev")
+
+        fetch = git.Remote.fetch
+        fetches = []
+
+        def fetch_then_disconnect(remote, *args, **kwargs):
+            results = fetch(remote, *args, **kwargs)
+            fetches.append(args)
+            # Any further network access would now fail
+            shutil.move(self.upstream, self.upstream + ".gone")
+            return results
+
+        with patch.object(git.Remote, "fetch", fetch_then_disconnect):
+            changes = _get_one(
+                self.mock_backend, {"host": "https://gitlab.example.com"}, "ns",
+                "hw1-student", self.local_dir,
+                ["master", "dev"], False, 1,
+            )
+
+        self.assertEqual(len(fetches), 1)
+        self.assertEqual(len(changes), 2)
+        local = git.Repo(self.local_dir)
+        self.assertEqual(local.heads.master.commit.hexsha, master)
+        self.assertEqual(local.heads.dev.commit.hexsha, dev)
+        self.assertEqual(local.active_branch.name, "master")
@@ -0,0 +1,350 @@
+import os
+
+import git
+
+from unittest.mock import MagicMock
+
+from assigner.cache import MetadataCache
+from assigner.commands.score import (
+    check_local_integrity,
+    check_repo_integrity,
+    get_most_recent_score,
+    handle_scoring,
+    merge_diff_args,
+    upload_scores,
+    verify_local_signature,
+    CIJobNotFound,
+)
+from assigner.tests.utils import AssignerTestCase
+
+
+class GetMostRecentScoreTestCase(AssignerTestCase):
+    def setUp(self):
+        self.repo = MagicMock()
+
+    def test_job_name(self):
+        """
+        get_most_recent_score should fetch a named job's artifact directly.
+        """
+        self.repo.get_latest_ci_artifact.return_value = "Score: 87.5\n"
+
+        score = get_most_recent_score(self.repo, "results.txt", "grade", "main")
+
+        self.assertEqual(score, 87.5)
+        self.repo.get_latest_ci_artifact.assert_called_once_with(
+            "main", "grade", "results.txt"
+        )
+        self.assertFalse(self.repo.list_ci_jobs.called)
+
+    def test_latest_successful_job(self):
+        """
+        get_most_recent_score should only look at the latest successful job.
+        """
+        self.repo.list_ci_jobs.return_value = iter([{"id": 12}])
+        self.repo.get_ci_artifact.return_value = "42"
+
+        self.assertEqual(get_most_recent_score(self.repo, "results.txt"), 42.0)
+        self.repo.list_ci_jobs.assert_called_once_with("success", per_page=1)
+        self.repo.get_ci_artifact.assert_called_once_with(12, "results.txt")
+
+    def test_no_successful_jobs(self):
+        """
+        get_most_recent_score should raise CIJobNotFound without successful jobs.
+        """
+        self.repo.list_ci_jobs.return_value = iter([])
+
+        with self.assertRaises(CIJobNotFound):
+            get_most_recent_score(self.repo, "results.txt")
+
+
+class HandleScoringTestCase(AssignerTestCase):
+    def setUp(self):
+        self.mock_fetch = self._create_patch("assigner.commands.score.fetch_score")
+        self.mock_upload = self._create_patch("assigner.commands.score.upload_score")
+        self.args = MagicMock(upload=True)
+        self.student = {"username": "abc123", "section": "A"}
+
+    def test_uploads_score(self):
+        """
+        handle_scoring should upload the score it fetched.
+        """
+        self.mock_fetch.return_value = 90.0
+
+        self.assertEqual(handle_scoring(None, None, self.args, self.student), 90.0)
+        self.mock_upload.assert_called_once_with(None, self.args, self.student, 90.0)
+
+    def test_skips_missing_score(self):
+        """
+        handle_scoring should not upload when there is no score.
+        """
+        self.mock_fetch.return_value = None
+
+        self.assertIsNone(handle_scoring(None, None, self.args, self.student))
+        self.assertFalse(self.mock_upload.called)
+
+
+class UploadScoresTestCase(AssignerTestCase):
+    def setUp(self):
+        mock_canvas = self._create_patch("assigner.commands.score.OptionalCanvas")
+        self.api = mock_canvas.get_api.return_value
+        mock_canvas.get_section_ids.return_value = {"A": 100, "B": 200}
+        mock_canvas.get_assigment_ids.return_value = {"A": 1, "B": 2}
+        self.api.get_assignment.return_value = {"points_possible": 50}
+        self.api.get_assignment_submissions.return_value = []
+        self.args = MagicMock(canvas_jobs=1)
+
+    def test_one_update_per_section(self):
+        """
+        upload_scores should upload each section's grades in one request.
+        """
+        scored = [
+            ({"username": "a", "section": "A", "canvas-id": 11}, 90.0),
+            ({"username": "b", "section": "B", "canvas-id": 21}, 80.0),
+            ({"username": "c", "section": "A", "canvas-id": 12}, 70.0),
+            ({"username": "d", "section": "A"}, 60.0),
+        ]
+
+        upload_scores(None, self.args, scored)
+
+        self.assertEqual(self.api.update_grades.call_count, 2)
+        self.api.update_grades.assert_any_call(100, 1, {"11": "90.0%", "12": "70.0%"})
+        self.api.update_grades.assert_any_call(200, 2, {"21": "80.0%"})
+        self.assertEqual(self.api.wait_for_progress.call_count, 2)
+
+    def test_only_changed_grades(self):
+        """
+        upload_scores should skip grades Canvas already has.
+        """
+        self.api.get_assignment_submissions.return_value = [
+            {"user_id": 11, "score": 45.0},
+            {"user_id": 12, "score": 30.0},
+            {"user_id": 13, "score": None},
+        ]
+        scored = [
+            ({"username": "a", "section": "A", "canvas-id": 11}, 90.0),
+            ({"username": "c", "section": "A", "canvas-id": 12}, 70.0),
+            ({"username": "e", "section": "A", "canvas-id": 13}, 10.0),
+        ]
+
+        upload_scores(None, self.args, scored)
+
+        self.api.update_grades.assert_called_once_with(
+            100, 1, {"12": "70.0%", "13": "10.0%"}
+        )
+
+    def test_ignores_late_deductions(self):
+        """
+        upload_scores should compare against the grade entered before Canvas
+        deducted late penalties.
+        """
+        self.api.get_assignment_submissions.return_value = [
+            {"user_id": 11, "score": 40.5, "entered_score": 45.0},
+            {"user_id": 12, "score": 27.0, "entered_score": 30.0},
+        ]
+
+        upload_scores(None, self.args, [
+            ({"username": "a", "section": "A", "canvas-id": 11}, 90.0),
+            ({"username": "c", "section": "A", "canvas-id": 12}, 70.0),
+        ])
+
+        self.api.update_grades.assert_called_once_with(100, 1, {"12": "70.0%"})
+
+    def test_nothing_changed(self):
+        """
+        upload_scores should not upload anything when no grades changed.
+        """
+        self.api.get_assignment_submissions.return_value = [
+            {"user_id": 11, "score": 45.0},
+        ]
+
+        upload_scores(None, self.args, [
+            ({"username": "a", "section": "A", "canvas-id": 11}, 90.0),
+        ])
+
+        self.assertFalse(self.api.update_grades.called)
+
+
+class CheckRepoIntegrityTestCase(AssignerTestCase):
+    def setUp(self):
+        self.cache = MetadataCache(os.path.join(self._create_tempdir(), "cache.sqlite"))
+        self._create_patch(
+            "assigner.commands.score.get_cache"
+        ).return_value = self.cache
+
+        self.repo = MagicMock(url="https://gitlab.example.com/ns/hw1")
+        self.history = ["c2", "c1", "base"]
+        self.repo.list_commits.side_effect = lambda ref, until="", per_page=None: iter(
+            [{"id": "base"}] if until else [{"id": c} for c in self.history]
+        )
+        self.repo.list_commit_files.side_effect = lambda c: {
+            "c1": ["main.py"], "c2": [".gitlab-ci.yml"], "c3": ["main.py"],
+        }[c]
+        self.repo.list_authorized_emails.return_value = ["prof@example.edu"]
+        self.repo.get_commit_signature_email.return_value = None
+        self.mock_logger = self._create_patch("assigner.commands.score.logger")
+
+    def test_clean_repo(self):
+        """
+        check_repo_integrity should stop after one comparison when no
+        protected files changed.
+        """
+        self.repo.compare.return_value = (["c2", "c1"], ["main.py"])
+
+        check_repo_integrity(self.repo, {".gitlab-ci.yml"}, "2026-10-01")
+
+        self.repo.compare.assert_called_once_with("base", "c2")
+        self.assertFalse(self.repo.list_commit_files.called)
+        self.assertFalse(self.mock_logger.warning.called)
+
+    def test_modified_repo(self):
+        """
+        check_repo_integrity should find the commits that changed
+        protected files.
+        """
+        self.repo.compare.return_value = (["c2", "c1"], ["main.py", ".gitlab-ci.yml"])
+
+        check_repo_integrity(self.repo, {".gitlab-ci.yml"}, "2026-10-01")
+
+        self.repo.get_commit_signature_email.assert_called_once_with("c2")
+        self.mock_logger.warning.assert_called_once()
+
+    def test_skips_template_commits(self):
+        """
+        check_repo_integrity should compare against the newest template
+        commit and not check template commits.
+        """
+        self.repo.compare.return_value = (["c2"], [".gitlab-ci.yml"])
+        self.repo.list_commit_files.side_effect = lambda c: [".gitlab-ci.yml"]
+
+        check_repo_integrity(self.repo, {".gitlab-ci.yml"}, "", {"c1", "t0"})
+
+        self.repo.compare.assert_called_once_with("c1", "c2")
+        self.repo.list_commit_files.assert_called_once_with("c2")
+
+    def test_resumes_from_checkpoint(self):
+        """
+        check_repo_integrity should only check commits newer than the last
+        check, and keep reporting earlier violations.
+        """
+        self.repo.compare.return_value = (["c2", "c1"], [".gitlab-ci.yml"])
+        check_repo_integrity(self.repo, {".gitlab-ci.yml"}, "2026-10-01")
+
+        self.history.insert(0, "c3")
+        self.repo.is_ancestor.return_value = True
+        self.repo.compare.reset_mock()
+        self.repo.compare.return_value = (["c3"], [".gitlab-ci.yml"])
+        self.repo.list_commit_files.reset_mock()
+        self.mock_logger.reset_mock()
+
+        check_repo_integrity(self.repo, {".gitlab-ci.yml"}, "2026-10-01")
+
+        self.repo.is_ancestor.assert_called_once_with("c2", "c3")
+        self.repo.compare.assert_called_once_with("c2", "c3")
+        self.repo.list_commit_files.assert_called_once_with("c3")
+        self.mock_logger.warning.assert_called_once_with(
+            "commit %s modified files: %s", "c2", str({".gitlab-ci.yml"})
+        )
+
+    def test_rewritten_history(self):
+        """
+        check_repo_integrity should check everything again when the last
+        checked commit is gone from the history.
+        """
+        self.repo.compare.return_value = (["c2", "c1"], ["main.py"])
+        check_repo_integrity(self.repo, {".gitlab-ci.yml"}, "2026-10-01")
+
+        self.history[0] = "c3"
+        self.repo.is_ancestor.return_value = False
+        self.repo.compare.reset_mock()
+
+        check_repo_integrity(self.repo, {".gitlab-ci.yml"}, "2026-10-01")
+
+        self.repo.compare.assert_called_once_with("base", "c3")
+
+
+class CheckLocalIntegrityTestCase(AssignerTestCase):
+    def setUp(self):
+        self.repo = git.Repo.init(self._create_tempdir(), initial_branch="master")
+        with self.repo.config_writer() as writer:
+            writer.set_value("user", "name", "Student")
+            writer.set_value("user", "email", "student@example.edu")
+            writer.set_value("commit", "gpgsign", "false")
+
+    def commit(self, filename, message):
+        with open(os.path.join(self.repo.working_dir, filename), "a", encoding="utf-8") as f:
+            f.write(message + "\n")
+        self.repo.index.add([filename])
+        return self.repo.index.commit(message).hexsha
+
+    def test_finds_unsigned_changes(self):
+        """
+        check_local_integrity should report unsigned commits that modified
+        protected files, skipping template commits.
+        """
+        template = self.commit(".gitlab-ci.yml", "template")
+        self.commit("main.py", "work")
+        tampered = self.commit(".gitlab-ci.yml", "tamper")
+
+        violations = check_local_integrity(
+            self.repo.working_dir, {".gitlab-ci.yml"}, None, {template}
+        )
+
+        self.assertEqual(violations, [(tampered, {".gitlab-ci.yml"})])
+
+    def test_finds_changes_in_merges(self):
+        """
+        check_local_integrity should report protected files changed while
+        merging.
+        """
+        template = self.commit(".gitlab-ci.yml", "template")
+        self.repo.git.checkout("-b", "feature")
+        self.commit("main.py", "feature")
+        self.repo.git.checkout("master")
+        self.commit("notes.txt", "notes")
+
+        self.repo.git.merge("--no-commit", "--no-ff", "feature")
+        with open(os.path.join(self.repo.working_dir, ".gitlab-ci.yml"), "a", encoding="utf-8") as f:
+            f.write("merge\n")
+        self.repo.git.add(".gitlab-ci.yml")
+        self.repo.git.commit("-m", "merge")
+        merge = self.repo.head.commit.hexsha
+
+        violations = check_local_integrity(
+            self.repo.working_dir, {".gitlab-ci.yml"}, None, {template}
+        )
+
+        self.assertEqual(len(self.repo.commit(merge).parents), 2)
+        self.assertEqual(violations, [(merge, {".gitlab-ci.yml"})])
+
+    def test_finds_changes_in_merges_on_older_git(self):
+        """
+        check_local_integrity should report protected files changed while
+        merging with git older than 2.31.
+        """
+        self._create_patch(
+            "assigner.commands.score.merge_diff_args", return_value=["-m", "--first-parent"]
+        )
+        self.test_finds_changes_in_merges()
+
+    def test_merge_diff_args(self):
+        mock_git = self._create_patch("assigner.commands.score.git.Git")
+        merge_diff_args.cache_clear()
+        self.addCleanup(merge_diff_args.cache_clear)
+
+        mock_git.return_value.version_info = (2, 39, 5)
+        self.assertEqual(merge_diff_args(), ["--diff-merges=first-parent"])
+
+        merge_diff_args.cache_clear()
+        mock_git.return_value.version_info = (2, 25, 1)
+        self.assertEqual(merge_diff_args(), ["-m", "--first-parent"])
+
+    def test_verify_local_signature(self):
+        self.assertFalse(verify_local_signature("G", "Prof <prof@example.edu>", None))
+        self.assertTrue(
+            verify_local_signature("U", "Prof <prof@example.edu>", ["prof@example.edu"])
+        )
+        self.assertFalse(
+            verify_local_signature("G", "TA <ta@example.edu>", ["prof@example.edu"])
+        )
+        self.assertFalse(verify_local_signature("N", "", None))
+        self.assertFalse(verify_local_signature("B", "Prof <prof@example.edu>", None))
@@ -0,0 +1,90 @@
+from assigner import parallel
+from assigner.tests.utils import AssignerTestCase
+
+
+class ExampleError(Exception):
+    pass
+
+
+def double_or_fail(item):
+    if item < 0:
+        raise ExampleError(item)
+    return item * 2
+
+
+class ImapTestCase(AssignerTestCase):
+    def test_serial_in_order(self):
+        """
+        imap should process items in order with a single job.
+        """
+        results = list(parallel.imap(double_or_fail, [1, 2, 3]))
+        self.assertEqual(results, [(1, 2, None), (2, 4, None), (3, 6, None)])
+
+    def test_concurrent_results(self):
+        """
+        imap should return a result for every item with several jobs.
+        """
+        results = parallel.imap(double_or_fail, range(20), jobs=4)
+        self.assertEqual(
+            sorted((item, result) for item, result, _ in results),
+            [(i, i * 2) for i in range(20)],
+        )
+
+    def test_collects_errors(self):
+        """
+        imap should hand back exceptions instead of raising them.
+        """
+        for jobs in (1, 3):
+            results = {
+                item: (result, error)
+                for item, result, error in parallel.imap(double_or_fail, [1, -1, 2], jobs)
+            }
+            self.assertEqual(results[1], (2, None))
+            self.assertEqual(results[2], (4, None))
+            self.assertIsNone(results[-1][0])
+            self.assertIsInstance(results[-1][1], ExampleError)
+
+
+def add_one(item, value):
+    return (item if value is None else value) + 1
+
+
+def fail_negative(item, value):
+    if item < 0:
+        raise ExampleError(item)
+    return value
+
+
+class PipelineTestCase(AssignerTestCase):
+    def test_runs_every_stage(self):
+        """
+        Pipeline should pass each stage's result on to the next one.
+        """
+        pipeline = parallel.Pipeline((add_one, 2), (add_one, 1), (add_one, 3))
+        results = pipeline.imap(range(10))
+        self.assertEqual(
+            sorted((item, result) for item, result, _ in results),
+            [(i, i + 3) for i in range(10)],
+        )
+
+    def test_failures_skip_later_stages(self):
+        """
+        Pipeline should hand back a stage's exception and not run the
+        remaining stages for that item.
+        """
+        calls = []
+
+        def record(item, value):
+            calls.append(item)
+            return value
+
+        pipeline = parallel.Pipeline((add_one, 2), (fail_negative, 2), (record, 2))
+        results = {
+            item: (result, error)
+            for item, result, error in pipeline.imap([1, -5, 2])
+        }
+        self.assertEqual(results[1], (2, None))
+        self.assertEqual(results[2], (3, None))
+        self.assertIsNone(results[-5][0])
+        self.assertIsInstance(results[-5][1], ExampleError)
+        self.assertEqual(sorted(calls), [1, 2])
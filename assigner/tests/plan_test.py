@@ -0,0 +1,55 @@
+from assigner.plan import Plan, format_duration, pages
+from assigner.tests.utils import AssignerTestCase
+
+
+class PlanTestCase(AssignerTestCase):
+    def setUp(self):
+        self.mock_latency = self._create_patch("assigner.plan.latency")
+
+    def test_tallies(self):
+        """
+        Plan should count actions, requests, and pushes.
+        """
+        plan = Plan("https://gitlab.example.com")
+        plan.add("create", 3, 1)
+        plan.add("create", 3, 1)
+        plan.add("skip")
+        plan.add_requests(2)
+
+        self.assertEqual(plan.actions, {"create": 2, "skip": 1})
+        self.assertEqual(plan.requests, 8)
+        self.assertEqual(plan.pushes, 2)
+
+    def test_estimate_uses_recorded_latencies(self):
+        """
+        Plan should estimate from recorded latencies, split across jobs.
+        """
+        self.mock_latency.side_effect = lambda host, kind: {"request": 0.2, "push": 4.0}[kind]
+        plan = Plan("https://gitlab.example.com")
+        plan.add("create", 10, 1)
+        plan.add("create", 10, 1)
+
+        self.assertAlmostEqual(plan.estimate(), 12.0)
+        self.assertAlmostEqual(plan.estimate(jobs=4, push_jobs=2), 5.0)
+
+    def test_estimate_defaults(self):
+        """
+        Plan should fall back on default latencies for new hosts.
+        """
+        self.mock_latency.return_value = None
+        plan = Plan("https://gitlab.example.com")
+        plan.add("create", 2, 1)
+
+        self.assertAlmostEqual(plan.estimate(), 4.0)
+
+
+class HelpersTestCase(AssignerTestCase):
+    def test_pages(self):
+        self.assertEqual(pages(0), 1)
+        self.assertEqual(pages(100), 1)
+        self.assertEqual(pages(101), 2)
+
+    def test_format_duration(self):
+        self.assertEqual(format_duration(4.4), "4s")
+        self.assertEqual(format_duration(125), "2m 5s")
+        self.assertEqual(format_duration(3 * 3600 + 120), "3h 2m")
@@ -0,0 +1,95 @@
+import os
+
+from unittest.mock import patch
+
+from assigner.ssh import multiplexed, requires_multiplexed_ssh
+from assigner.tests.utils import AssignerTestCase
+
+
+class MultiplexedTestCase(AssignerTestCase):
+    def setUp(self):
+        environ = patch.dict(os.environ)
+        environ.start()
+        self.addCleanup(environ.stop)
+        for var in ("GIT_SSH", "GIT_SSH_COMMAND"):
+            os.environ.pop(var, None)
+
+        self._create_patch("assigner.ssh.os.name", new="posix")
+        self._create_patch("assigner.ssh.shutil.which", return_value="/usr/bin/ssh")
+        self.mock_config = self._create_patch(
+            "assigner.ssh._has_ssh_command_config", return_value=False
+        )
+        self.mock_run = self._create_patch("assigner.ssh.subprocess.run")
+
+    def test_sets_and_removes_ssh_command(self):
+        """
+        multiplexed should point GIT_SSH_COMMAND at a control master only
+        inside the context.
+        """
+        with multiplexed():
+            command = os.environ["GIT_SSH_COMMAND"]
+            self.assertTrue(command.startswith("ssh -o ControlMaster=auto"))
+        self.assertNotIn("GIT_SSH_COMMAND", os.environ)
+
+    def test_extends_existing_ssh_command(self):
+        """
+        multiplexed should keep the user's GIT_SSH_COMMAND and restore it after.
+        """
+        os.environ["GIT_SSH_COMMAND"] = "ssh -i key"
+
+        with multiplexed():
+            self.assertTrue(
+                os.environ["GIT_SSH_COMMAND"].startswith("ssh -i key -o ControlMaster=auto")
+            )
+        self.assertEqual(os.environ["GIT_SSH_COMMAND"], "ssh -i key")
+
+    def test_skips_git_ssh(self):
+        """
+        multiplexed should leave git alone when GIT_SSH is set.
+        """
+        os.environ["GIT_SSH"] = "plink"
+
+        with multiplexed():
+            self.assertNotIn("GIT_SSH_COMMAND", os.environ)
+
+    def test_skips_ssh_command_config(self):
+        """
+        multiplexed should not override core.sshCommand from git's config.
+        """
+        self.mock_config.return_value = True
+
+        with multiplexed():
+            self.assertNotIn("GIT_SSH_COMMAND", os.environ)
+
+    def test_closes_masters_and_cleans_up(self):
+        """
+        multiplexed should close open master connections and remove the
+        control directory, even if the command fails.
+        """
+        with self.assertRaises(RuntimeError):
+            with multiplexed():
+                command = os.environ["GIT_SSH_COMMAND"]
+                control_dir = os.path.dirname(command.split("ControlPath=")[1].split()[0])
+                socket = os.path.join(control_dir, "socket")
+                with open(socket, "w", encoding="utf-8"):
+                    pass
+                raise RuntimeError()
+
+        self.assertFalse(os.path.exists(control_dir))
+        args = self.mock_run.call_args[0][0]
+        self.assertIn("ControlPath={}".format(socket), args)
+        self.assertIn("exit", args)
+
+    def test_decorator(self):
+        """
+        requires_multiplexed_ssh should run the command inside multiplexed
+        and keep its name.
+        """
+        def assign():
+            return os.environ.get("GIT_SSH_COMMAND")
+
+        wrapped = requires_multiplexed_ssh(assign)
+
+        self.assertIn("ControlMaster=auto", wrapped())
+        self.assertEqual(wrapped.__name__, "assign")
+        self.assertIs(wrapped.__wrapped__, assign)
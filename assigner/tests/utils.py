@@ -1,3 +1,5 @@
+import tempfile
+
 from unittest import TestCase
 from unittest.mock import patch
 
@@ -35,6 +37,17 @@ class AssignerTestCase(TestCase):
 
         return target_mock
 
+    def _create_tempdir(self):
+        """
+        Shortcut for creating a temporary directory that is removed
+        when the test finishes. Returns its path.
+        """
+        # Cleaned up by addCleanup rather than a with block
+        tmpdir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(tmpdir.cleanup)
+
+        return tmpdir.name
+
 
 class AssignerIntegrationTestCase(AssignerTestCase):
     def setUp(self):